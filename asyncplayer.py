@@ -0,0 +1,320 @@
+# The asyncio front end of oskaplayer, for a server that hosts many games at
+# once. A search would stall the event loop, so it runs in a pool of worker
+# processes, and the event loop only waits for its answer:
+#
+#     engine = AsyncEngine()
+#     board = await engine.best_move(board, 'w', 0.5, game=game_id)
+#
+# Every game has at most one search at a time. A new search of a game, or a
+# client that goes away while it waits, cancels the old search: a search that
+# has not started yet is dropped, and a running one stops at the next board it
+# looks at. The searches wait for a worker in the order in which they came,
+# and every search is held to its time budget, so one deep search cannot keep
+# the other games waiting for long.
+
+import asyncio
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+
+from evaluation import count_pieces
+from evaluation import winner
+from geometry import start_board
+from movegen import movegen
+from oskaplayer import convert_format
+from oskaplayer import iterative_deepening
+from transposition import TranspositionTable
+
+# The number of cancel flags that the processes share. A search uses the flag
+# of its ticket modulo this, so the flags only run out with this many searches
+# at the same time, and then a cancelled search just runs to its budget.
+CANCEL_SLOTS = 4096
+
+# The longest time budget that a search gets
+MAX_BUDGET = 5.0
+
+# The cancel flags and the transposition table of a worker process, which is
+# kept from one search to the next
+_worker_flags = None
+_worker_table = None
+
+
+# The deadline of a search in a worker process. It compares like a
+# time.perf_counter() value, see ponder.StopDeadline, and has passed at its time
+# or as soon as the search is cancelled.
+class TicketDeadline:
+    # @param:
+    # when: the time.perf_counter() value at which the time is up
+    # flags: the shared cancel flags
+    # ticket: the number of the search, a cancelled search finds its number in
+    #         its flag
+    def __init__(self, when, flags, ticket):
+        self.when = when
+        self.flags = flags
+        self.ticket = ticket
+
+    # time.perf_counter() > deadline
+    def __lt__(self, now):
+        return (now > self.when or
+                self.flags[self.ticket % len(self.flags)] == self.ticket)
+
+    # time.perf_counter() < deadline
+    def __gt__(self, now):
+        return not self.__lt__(now)
+
+
+# This function runs in every worker process when it starts
+#   @param:
+#   flags: the shared cancel flags
+def init_worker(flags):
+    global _worker_flags, _worker_table
+    _worker_flags = flags
+    _worker_table = TranspositionTable()
+
+
+# This function runs in a worker process and searches a board with iterative
+# deepening until the budget is up or the search is cancelled
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   budget: the number of seconds that the search may take
+#   ticket: the number of the search
+#
+#   returns the next best move in the form of a gameboard, like oskaplayer
+def worker_search(board, player, budget, ticket):
+    deadline = TicketDeadline(time.perf_counter() + budget, _worker_flags,
+                              ticket)
+    initial_board = [list(row) for row in board]
+    ans = iterative_deepening(initial_board, player, budget,
+                              table=_worker_table, deadline=deadline)
+    if ans == None:
+        return None
+    return convert_format(ans)
+
+
+# The pool of worker processes and the searches of the games, see the top of
+# this file. It must be created and used in one event loop.
+class AsyncEngine:
+    # This function starts the worker processes
+    #   @param:
+    #   workers: the number of worker processes, the number of cores without it
+    #   max_budget: the longest time budget that a search gets
+    def __init__(self, workers=None, max_budget=MAX_BUDGET):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.max_budget = max_budget
+        self.flags = RawArray('q', CANCEL_SLOTS)
+        self.pool = ProcessPoolExecutor(max_workers=workers,
+                                        initializer=init_worker,
+                                        initargs=(self.flags,))
+        self.slots = asyncio.Semaphore(workers)
+        self.tickets = itertools.count(1)
+        # The (ticket, task) of the search of every game, and the number of
+        # searches that were cancelled
+        self.games = {}
+        self.cancelled = 0
+
+    # This function determines the next move without blocking the event loop
+    #   @param:
+    #   board: the gameboard in the form of a list of strings
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #   budget: the number of seconds that the search may take, at most
+    #           max_budget
+    #   game: an optional id of the game. A new search of the same game
+    #         cancels the one before it, whose caller gets CancelledError.
+    #
+    #   returns the next best move in the form of a gameboard, like oskaplayer
+    async def best_move(self, board, player, budget, game=None):
+        budget = min(budget, self.max_budget)
+        if game is not None:
+            self.cancel(game)
+        ticket = next(self.tickets)
+        task = asyncio.ensure_future(self.search(board, player, budget,
+                                                 ticket))
+        if game is not None:
+            self.games[game] = (ticket, task)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            if game is not None and self.games.get(game, (None,))[0] == ticket:
+                del self.games[game]
+
+    # This function cancels the search of a game, if it has one, for example
+    # when its client has gone away
+    #   @param:
+    #   game: the id of the game
+    def cancel(self, game):
+        found = self.games.pop(game, None)
+        if found is not None:
+            found[1].cancel()
+
+    # This function waits for a worker and runs a search there
+    #   @param: see best_move
+    #   ticket: the number of the search
+    #
+    #   returns the next best move in the form of a gameboard
+    async def search(self, board, player, budget, ticket):
+        loop = asyncio.get_running_loop()
+        async with self.slots:
+            future = loop.run_in_executor(self.pool, worker_search, board,
+                                          player, budget, ticket)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The worker is told to stop, and keeps its place until it has,
+                # so the searches in the workers never outnumber them
+                self.flags[ticket % CANCEL_SLOTS] = ticket
+                try:
+                    await future
+                except Exception:
+                    pass
+                raise
+
+    # This function stops the worker processes
+    def close(self):
+        for game in list(self.games):
+            self.cancel(game)
+        self.pool.shutdown(wait=True)
+
+
+# This function computes a percentile of a list of numbers
+#   @param:
+#   values: the numbers
+#   fraction: the fraction of the numbers that are at most the percentile
+#
+#   returns the percentile, or 0.0 for an empty list
+def percentile(values, fraction):
+    if values == []:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(math.ceil(fraction * len(ordered))) - 1, 0)
+    return ordered[index]
+
+
+# This function makes a random move for the client of the load generator
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   generator: the random.Random of the game
+#   avoid: an optional gameboard not to move to, unless it is the only move
+#
+#   returns the new gameboard, the same board when the player has to pass, or
+#   None when neither player can move
+def random_move(board, player, generator, avoid=None):
+    opponent = 'w' if player == 'b' else 'b'
+    new_boards = movegen([list(row) for row in board], player)
+    if new_boards == []:
+        if movegen([list(row) for row in board], opponent) == []:
+            return None
+        return board
+    new_boards = [convert_format(new_board) for new_board in new_boards]
+    others = [new_board for new_board in new_boards if new_board != avoid]
+    return generator.choice(others if others != [] else new_boards)
+
+
+# This function plays one game of the load generator: the engine plays white,
+# and the client plays black with random moves after thinking for a while. A
+# client may also change its mind while the engine is searching and make
+# another move instead of its last one, which makes the search stale: it is
+# cancelled and the engine searches the new board.
+#   @param:
+#   engine: the AsyncEngine
+#   game: the id of the game
+#   size: the size n of the board
+#   budget: the time budget of every search
+#   think: the longest time that the client thinks
+#   interrupt: the chance that the client interrupts a search
+#   latencies: the list to add the seconds of every answered search to
+#   generator: the random.Random of the game
+async def load_game(engine, game, size, budget, think, interrupt, latencies,
+                    generator):
+    board = start_board(size)
+    player = 'w'
+    # The board before the last move of the client
+    before = None
+    while True:
+        if player == 'w':
+            start = time.perf_counter()
+            if before is not None and generator.random() < interrupt:
+                task = asyncio.ensure_future(engine.best_move(board, player,
+                                                              budget, game))
+                await asyncio.sleep(generator.uniform(0, budget))
+                engine.cancel(game)
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                # The client takes its last move back and makes another one
+                player = 'b'
+                new_board = random_move(before, player, generator, board)
+            else:
+                new_board = await engine.best_move(board, player, budget,
+                                                   game)
+                latencies.append(time.perf_counter() - start)
+        else:
+            await asyncio.sleep(generator.uniform(0, think))
+            before = board
+            new_board = random_move(board, player, generator)
+        if new_board is None:
+            return
+        board = new_board
+        if winner(*count_pieces(board), player) != 0:
+            return
+        player = 'b' if player == 'w' else 'w'
+
+
+# This function plays many games at once against an AsyncEngine and measures
+# how fast it answers
+#   @param:
+#   games: the number of games at the same time
+#   size: the size n of the boards
+#   budget: the time budget of every search
+#   workers: the number of worker processes, see AsyncEngine
+#   think: the longest time that a client thinks
+#   interrupt: the chance that a client interrupts a search
+#   seed: the seed of the clients
+#
+#   returns a dict with the number of answered searches, the searches per
+#   second, the median and 99th percentile of the seconds of a search, and
+#   the number of cancelled searches
+async def load_test(games=200, size=5, budget=0.05, workers=None, think=0.05,
+                    interrupt=0.05, seed=0):
+    engine = AsyncEngine(workers)
+    latencies = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*[
+            load_game(engine, game, size, budget, think, interrupt, latencies,
+                      random.Random("{}:{}".format(seed, game)))
+            for game in range(0, games)])
+    finally:
+        seconds = time.perf_counter() - start
+        engine.close()
+    return {
+        'games': games,
+        'workers': engine.workers,
+        'searches': len(latencies),
+        'seconds': seconds,
+        'searches_per_second': len(latencies) / seconds if seconds else 0.0,
+        'p50_seconds': percentile(latencies, 0.50),
+        'p99_seconds': percentile(latencies, 0.99),
+        'cancelled': engine.cancelled,
+    }
+
+
+# Usage: python asyncplayer.py [games] [budget] [workers] [size]
+if __name__ == '__main__':
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    size = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+    print(asyncio.run(load_test(games, size, budget, workers)))
@@ -0,0 +1,369 @@
+# The evaluation of many boards at once with NumPy. The boards are stacked
+# into one array of cell codes, and the piece counts, the steps and the rules
+# of score are computed for all of them with array operations instead of one
+# Python call per board. The values are exactly the ones of board_evaluator.
+#
+# minmax_batch uses it for the last step of the minimax search: the search
+# walks down to the boards one step above the leaves, stacks all of them, and
+# finds the moves and values of every leaf in one go.
+#
+# It needs NumPy, see requirements.txt, which the rest of the player does not.
+
+import numpy
+
+from evaluation import EvalState
+from geometry import apply_move
+from geometry import geometry
+from geometry import make_move
+from geometry import unmake_move
+from movegen import get_backend
+
+# The cell codes of the stacked boards, which are the bytes of the characters
+# of the gameboard, so a board is stacked by joining its rows
+EMPTY = ord('-')
+WHITE = ord('w')
+BLACK = ord('b')
+
+# A value below every value of score, for the moves that cannot be made
+NO_VALUE = -1000
+
+# The number of boards that frontier_values gets at a time, which bounds the
+# memory of the arrays of all their moves
+CHUNK = 4096
+
+# The move arrays that have already been computed, keyed by the board size n
+_move_arrays = {}
+
+
+# This function stacks boards into one array of cell codes
+#   @param:
+#   boards: a list of gameboards of the same size
+#
+#   returns an array with a row of cell codes for every board
+def encode(boards):
+    rows = []
+    for board in boards:
+        rows.append(''.join([''.join(row) for row in board]))
+    return stack(rows)
+
+
+# This function turns the joined rows of boards into an array of cell codes
+#   @param:
+#   rows: a list with a string of all the cells of every board
+#
+#   returns an array with a row of cell codes for every board
+def stack(rows):
+    codes = numpy.frombuffer(''.join(rows).encode('ascii'), dtype=numpy.uint8)
+    return codes.reshape(len(rows), -1)
+
+
+# This function computes the values of score for arrays of piece counts and
+# steps, with the same rules in the same order
+#   @param:
+#   white_count: the array of the numbers of white pieces
+#   black_count: the array of the numbers of black pieces
+#   white_step: the array of the steps that the white pieces still need
+#   black_step: the array of the steps that the black pieces still need
+#   starting_player: the player whose favor we are in to evaluate the boards
+#
+#   returns the array of the values
+def score_batch(white_count, black_count, white_step, black_step,
+                starting_player):
+    if starting_player == 'w':
+        own_count, other_count = white_count, black_count
+        own_step, other_step = white_step, black_step
+    else:
+        own_count, other_count = black_count, white_count
+        own_step, other_step = black_step, white_step
+
+    values = other_step - own_step
+    values = numpy.where((own_count == 0) | (other_step == 0), -20, values)
+    values = numpy.where((other_count == 0) | (own_step == 0), 20, values)
+
+    # If both players have all their pieces in place, the numbers of pieces
+    # decide, which comes before the other rules
+    in_place = ((black_step == 0) & (white_step == 0) &
+                (black_count != 0) & (white_count != 0))
+    values = numpy.where(in_place & (own_count > other_count), 20, values)
+    values = numpy.where(in_place & (own_count < other_count), -20, values)
+    return values
+
+
+# This function decides the winner for arrays of piece counts and steps, like
+# evaluation.winner
+#   @param:
+#   white_count: the array of the numbers of white pieces
+#   black_count: the array of the numbers of black pieces
+#   white_step: the array of the steps that the white pieces still need
+#   black_step: the array of the steps that the black pieces still need
+#   player: the player who has just moved
+#
+#   returns the array of the results, 1 if the black wins, 2 if the white
+#   wins and 0 otherwise
+def winner_batch(white_count, black_count, white_step, black_step, player):
+    white_wins = (black_count == 0) | (white_step == 0)
+    black_wins = (white_count == 0) | (black_step == 0)
+    if player == 'w':
+        return numpy.where(white_wins, 2, numpy.where(black_wins, 1, 0))
+    return numpy.where(black_wins, 1, numpy.where(white_wins, 2, 0))
+
+
+# This function computes the piece counts and steps of stacked boards
+#   @param:
+#   codes: the array of cell codes, see encode
+#   n: the number of cells in the first row of the boards
+#
+#   returns the arrays (white_count, black_count, white_step, black_step)
+def count_batch(codes, n):
+    arrays = move_arrays(n)
+    white = codes == WHITE
+    black = codes == BLACK
+    return (white.sum(axis=1), black.sum(axis=1),
+            white @ arrays['white_steps'], black @ arrays['black_steps'])
+
+
+# This function evaluates many boards like board_evaluator
+#   @param:
+#   boards: a list of gameboards of the same size
+#   starting_player: the player whose favor we are in to evaluate the boards
+#
+#   returns the list of the values
+def board_evaluator_batch(boards, starting_player):
+    if boards == []:
+        return []
+    counts = count_batch(encode(boards), len(boards[0][0]))
+    return score_batch(*counts, starting_player).tolist()
+
+
+# This function lays the move tables of a board size out as arrays, one entry
+# for every move that a piece could make from every cell, in the order of
+# legal_moves
+#   @param:
+#   n: the number of cells in the first row of the board
+#
+#   returns a dict with
+#   'white_steps', 'black_steps': the steps from every cell to the goal row
+#   'w', 'b': a dict of arrays over the moves of the player: 'frm', 'to' and
+#             'over' cell indices ('over' is 0 for a simple move), 'jump' and
+#             the 'own_step' and 'other_step' that the move takes away
+def move_arrays(n):
+    if n in _move_arrays:
+        return _move_arrays[n]
+
+    tables = geometry(n)
+    index = tables['index']
+    rows = len(tables['widths'])
+    result = {
+        'white_steps': numpy.array([rows - row - 1
+                                    for (row, col) in tables['cells']]),
+        'black_steps': numpy.array([row for (row, col) in tables['cells']]),
+    }
+    for player in ('w', 'b'):
+        frm, to, over, jump, own_step, other_step = [], [], [], [], [], []
+        for (row, col) in tables['cells']:
+            for move in tables[player][row][col]:
+                frm.append(index[move.frm])
+                to.append(index[move.to])
+                over.append(0 if move.captured is None
+                            else index[move.captured])
+                jump.append(move.captured is not None)
+                own_step.append(abs(move.to[0] - move.frm[0]))
+                if move.captured is None:
+                    other_step.append(0)
+                elif player == 'w':
+                    other_step.append(move.captured[0])
+                else:
+                    other_step.append(rows - move.captured[0] - 1)
+        result[player] = {
+            'frm': numpy.array(frm), 'to': numpy.array(to),
+            'over': numpy.array(over), 'jump': numpy.array(jump),
+            'own_step': numpy.array(own_step),
+            'other_step': numpy.array(other_step),
+        }
+    _move_arrays[n] = result
+    return result
+
+
+# This function finds the legal moves of stacked boards, as a mask over the
+# move arrays of the board size
+#   @param:
+#   codes: the array of cell codes, see encode
+#   n: the number of cells in the first row of the boards
+#   player: the player who moves on all the boards
+#
+#   returns a boolean array with a row for every board and a column for every
+#   move of move_arrays
+def legal_mask(codes, n, player):
+    moves = move_arrays(n)[player]
+    own = WHITE if player == 'w' else BLACK
+    other = BLACK if player == 'w' else WHITE
+    return ((codes[:, moves['frm']] == own) &
+            (codes[:, moves['to']] == EMPTY) &
+            (~moves['jump'] | (codes[:, moves['over']] == other)))
+
+
+# This function computes the piece counts and steps of the boards after every
+# move of move_arrays, whether the move is legal or not
+#   @param:
+#   counts: the array of the (white_count, black_count, white_step,
+#           black_step) of every board
+#   n: the number of cells in the first row of the boards
+#   player: the player who moves on all the boards
+#
+#   returns the arrays (white_count, black_count, white_step, black_step) with
+#   a row for every board and a column for every move
+def move_counts(counts, n, player):
+    moves = move_arrays(n)[player]
+    white_count = counts[:, 0:1]
+    black_count = counts[:, 1:2]
+    white_step = counts[:, 2:3]
+    black_step = counts[:, 3:4]
+    jump = moves['jump'].astype(numpy.int64)
+    if player == 'w':
+        return (white_count, black_count - jump,
+                white_step - moves['own_step'],
+                black_step - moves['other_step'])
+    return (white_count - jump, black_count,
+            white_step - moves['other_step'],
+            black_step - moves['own_step'])
+
+
+# This function finds the values of stacked boards one step above the leaves:
+# every board takes the maximum (or minimum) value of the boards that its
+# moves lead to, or its own value when the player cannot move, like dfs
+#   @param:
+#   codes: the array of cell codes, see encode
+#   counts: the array of the (white_count, black_count, white_step,
+#           black_step) of every board
+#   n: the number of cells in the first row of the boards
+#   player: the player who moves on all the boards
+#   starting_player: the player whose favor we are in to evaluate the boards
+#   maximizing: True if the player picks the maximum
+#
+#   returns the array of the values of the boards
+def frontier_values(codes, counts, n, player, starting_player, maximizing):
+    legal = legal_mask(codes, n, player)
+    children = score_batch(*move_counts(counts, n, player), starting_player)
+    if maximizing:
+        values = numpy.where(legal, children, NO_VALUE).max(axis=1)
+    else:
+        values = numpy.where(legal, children, -NO_VALUE).min(axis=1)
+    own_values = score_batch(counts[:, 0], counts[:, 1], counts[:, 2],
+                             counts[:, 3], starting_player)
+    return numpy.where(legal.any(axis=1), values, own_values)
+
+
+# This function employs the minimax search like minmax and finds the same
+# move, but evaluates the leaves with frontier_values
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to look ahead
+#
+#   returns the next best move in the form of a gameboard
+def minmax_batch(board, player, moves):
+    backend = get_backend()
+    next_moves = backend.legal_moves(board, player)
+
+    # If there is not any move that the player can make
+    if next_moves == []:
+        # If both players cannot make any moves, then the game has reached a tie
+        if backend.legal_moves(board, 'w' if player=='b' else 'b') == []:
+            return None
+        # Else we let the opponent player make the next move
+        return board
+
+    work_board = [list(row) for row in board]
+    state = EvalState(work_board)
+    new_player = 'w' if player == 'b' else 'b'
+
+    # The walk down records the shape of the search: a board one step above
+    # the leaves becomes the index of its row in the stack, a board without
+    # moves becomes its own value, and the other boards become the list of
+    # the shapes of their moves
+    codes = []
+    counts = []
+    tree = []
+    for move in next_moves:
+        make_move(work_board, move)
+        state.make(move, player)
+        # With one step to look ahead, the moves of the root are the leaves
+        if moves == 1:
+            tree.append((state.evaluate(player),))
+        else:
+            tree.append(collect(work_board, new_player, 2, moves, player,
+                                state, codes, counts))
+        state.unmake(move, player)
+        unmake_move(work_board, move)
+
+    values = []
+    n = len(board[0])
+    frontier_player = player if moves % 2 == 1 else new_player
+    for start in range(0, len(counts), CHUNK):
+        values.extend(frontier_values(stack(codes[start:start + CHUNK]),
+                                      numpy.array(counts[start:start + CHUNK]),
+                                      n, frontier_player, player,
+                                      moves % 2 == 1).tolist())
+
+    best = 0
+    best_value = None
+    for i in range(0, len(tree)):
+        value = resolve(tree[i], 2, values)
+        if best_value is None or best_value < value:
+            best = i
+            best_value = value
+    return apply_move(board, next_moves[best])
+
+
+# This function walks down the search for minmax_batch, see there
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   count: the current number of steps that we have already looked through
+#   moves: the total number of steps to look ahead
+#   starting_player: the player whose favor we are in to evaluate the board
+#   state: the EvalState of the board
+#   codes: the list that the joined rows of the stacked boards are added to
+#   counts: the list that the counts of the stacked boards are added to
+#
+#   returns the shape of the search below the board
+def collect(board, player, count, moves, starting_player, state, codes, counts):
+    if count == moves:
+        codes.append(''.join([''.join(row) for row in board]))
+        counts.append((state.white_count, state.black_count,
+                       state.white_step, state.black_step))
+        return len(counts) - 1
+
+    next_moves = get_backend().legal_moves(board, player)
+    if next_moves == []:
+        return (state.evaluate(starting_player),)
+
+    new_player = 'w' if player == 'b' else 'b'
+    shape = []
+    for move in next_moves:
+        make_move(board, move)
+        state.make(move, player)
+        shape.append(collect(board, new_player, count + 1, moves,
+                             starting_player, state, codes, counts))
+        state.unmake(move, player)
+        unmake_move(board, move)
+    return shape
+
+
+# This function computes the value of a board from the shape of its search,
+# see minmax_batch
+#   @param:
+#   shape: the shape of the search below the board
+#   count: the current number of steps that we have already looked through
+#   values: the values of the stacked boards
+#
+#   returns the value of the board
+def resolve(shape, count, values):
+    if isinstance(shape, int):
+        return values[shape]
+    if isinstance(shape, tuple):
+        return shape[0]
+    child_values = [resolve(child, count + 1, values) for child in shape]
+    if count % 2 == 0:
+        return min(child_values)
+    return max(child_values)
@@ -0,0 +1,375 @@
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from evaluation import count_pieces
+from evaluation import score
+from evaluation import winner
+from geometry import start_board
+from movegen import movegen
+from oskaplayer import board_evaluator
+from oskaplayer import oskaplayer
+from perft import perft_moves
+from stats import SearchStats
+
+
+# The positions that the benchmark runs on, as (name, board, player, depth)
+# tuples: the starting boards, boards from the middle of a game and endgames
+# where most moves are jumps. depth is the deepest search on the board, the
+# move generator is counted to the same depth.
+POSITIONS = [
+    ('opening-4', ['wwww','---','--','---','bbbb'], 'w', 8),
+    ('opening-5', ['wwwww','----','---','--','---','----','bbbbb'], 'w', 7),
+    ('opening-6', ['wwwwww','-----','----','---','--','---','----','-----',
+                   'bbbbbb'], 'w', 6),
+    ('opening-8', ['wwwwwwww','-------','------','-----','----','---','--',
+                   '---','----','-----','------','-------','bbbbbbbb'], 'w', 4),
+    ('midgame-4', ['w-w-','-w-','b-','--b','b--b'], 'w', 8),
+    ('midgame-5', ['w-ww-','-w--','-b-','w-','b--','-b--','b-b-b'], 'b', 6),
+    ('midgame-6', ['ww-w-w','--w--','-w--','b-w','--','-bb','b---','--b--',
+                   'b-b-bb'], 'w', 5),
+    ('endgame-4', ['----','-w-','bw','b--','----'], 'w', 8),
+    ('endgame-5', ['-----','-w--','wbw','b-','-w-','--b-','-----'], 'b', 7),
+    ('endgame-6', ['------','-----','-w-w','wbw','bb','-b-','-w--','-----',
+                   '------'], 'w', 8),
+    ('endgame-8', ['--------','-------','------','--w--','-w-w','wbw','bb',
+                   'bwb','-b-b','--b--','------','-------','--------'], 'b', 6),
+]
+
+# The number of times every board is evaluated by board_evaluator
+EVALUATOR_ROUNDS = 2000
+
+# The board sizes of the scaling benchmark, and how deep it counts the moves
+# and searches on every size
+SCALING_SIZES = tuple(range(4, 13))
+SCALING_MOVEGEN_DEPTH = 4
+SCALING_SEARCH_DEPTH = 6
+
+# The number of times every scaling measurement is timed, the fastest counts
+SCALING_ROUNDS = 3
+
+
+# This function times the move generator on a board at every depth up to the
+# given one, see perft_moves
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   depth: the deepest count
+#
+#   returns a list with the nodes, seconds and nodes per second of every depth
+def bench_movegen(board, player, depth):
+    work_board = [list(row) for row in board]
+    result = []
+    for d in range(1, depth + 1):
+        start = time.perf_counter()
+        nodes = perft_moves(work_board, player, d)
+        seconds = time.perf_counter() - start
+        result.append({'depth': d, 'nodes': nodes, 'seconds': seconds,
+                       'nodes_per_second': nodes / seconds if seconds else 0.0})
+    return result
+
+
+# This function times board_evaluator on all the benchmark boards
+#   @param:
+#   rounds: the number of times every board is evaluated
+#
+#   returns the number of evaluations, the seconds and evaluations per second
+def bench_evaluator(rounds=EVALUATOR_ROUNDS):
+    boards = [board for (name, board, player, depth) in POSITIONS]
+    start = time.perf_counter()
+    for k in range(0, rounds):
+        for board in boards:
+            board_evaluator(board, 'w')
+    seconds = time.perf_counter() - start
+    calls = rounds * len(boards)
+    return {'calls': calls, 'seconds': seconds,
+            'calls_per_second': calls / seconds if seconds else 0.0}
+
+
+# This function times oskaplayer on a board at every depth up to the given one.
+# The search is given an evaluator that counts its calls, so the number of
+# evaluated boards can be reported without changing the search. Every depth is
+# searched a second time under tracemalloc for the peak memory, since
+# tracemalloc slows the search down too much to be timed along with it.
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   depth: the deepest search
+#
+#   returns a list with the seconds, evaluated boards, evaluations per second,
+#   peak memory in bytes and chosen move of every depth
+def bench_search(board, player, depth):
+    calls = [0]
+
+    def counting_score(white_count, black_count, white_step, black_step,
+                       starting_player):
+        calls[0] += 1
+        return score(white_count, black_count, white_step, black_step,
+                     starting_player)
+
+    result = []
+    for d in range(1, depth + 1):
+        calls[0] = 0
+        start = time.perf_counter()
+        move = oskaplayer(board, player, d, evaluator=counting_score)
+        seconds = time.perf_counter() - start
+        evaluations = calls[0]
+
+        tracemalloc.start()
+        oskaplayer(board, player, d, evaluator=counting_score)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        result.append({'depth': d, 'seconds': seconds,
+                       'evaluations': evaluations,
+                       'evaluations_per_second':
+                           evaluations / seconds if seconds else 0.0,
+                       'peak_bytes': peak, 'move': move})
+    return result
+
+
+# This function runs the whole benchmark
+#   @param:
+#   max_depth: an optional limit on the depth of every position, for a quick run
+#
+#   returns the results as a dict that can be written as JSON
+def run(max_depth=None):
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'evaluator': bench_evaluator(),
+        'positions': [],
+    }
+    for (name, board, player, depth) in POSITIONS:
+        if max_depth is not None and depth > max_depth:
+            depth = max_depth
+        report['positions'].append({
+            'name': name,
+            'size': len(board[0]),
+            'player': player,
+            'movegen': bench_movegen(board, player, depth),
+            'search': bench_search(board, player, depth),
+        })
+    return report
+
+
+# This function plays random moves from the starting board of size n, for a
+# board from the middle of a game on any size
+#   @param:
+#   n: the number of cells in the first row of the board
+#   plies: the number of moves to play
+#   seed: the seed of the random moves
+#
+#   returns the gameboard in the form of a list of strings and the player to
+#   move on it
+def midgame_board(n, plies, seed=0):
+    generator = random.Random("{}:{}".format(seed, n))
+    board = [list(row) for row in start_board(n)]
+    player = 'w'
+    for ply in range(0, plies):
+        new_boards = movegen(board, player)
+        if new_boards != []:
+            new_board = generator.choice(new_boards)
+            if winner(*count_pieces(new_board), player) != 0:
+                break
+            board = new_board
+        player = 'b' if player == 'w' else 'w'
+    return ([''.join(row) for row in board], player)
+
+
+# This function measures the costs on a board: the boards that the move
+# generator makes per second, the boards that the search visits per second,
+# the memory of every new board that movegen makes and the peak memory of the
+# search
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   movegen_depth: the depth of the move generator count, see perft_moves
+#   search_depth: the number of steps that the search looks ahead
+#   rounds: the number of times to time the move generator and the search
+#
+#   returns a dict of the measurements
+def bench_size(board, player, movegen_depth, search_depth,
+               rounds=SCALING_ROUNDS):
+    work_board = [list(row) for row in board]
+    movegen_seconds = None
+    for k in range(0, rounds):
+        start = time.perf_counter()
+        movegen_nodes = perft_moves(work_board, player, movegen_depth)
+        seconds = time.perf_counter() - start
+        if movegen_seconds is None or seconds < movegen_seconds:
+            movegen_seconds = seconds
+
+    # movegen copies the board for every move, so its memory per new board is
+    # the memory of one board
+    tracemalloc.start()
+    new_boards = movegen(work_board, player)
+    board_bytes = tracemalloc.get_traced_memory()[1] / max(len(new_boards), 1)
+    tracemalloc.stop()
+
+    # The search is counted with the statistics, timed without them, and run
+    # a third time under tracemalloc, see bench_search
+    stats = SearchStats()
+    oskaplayer(board, player, search_depth, stats=stats)
+    nodes = sum(stats.nodes) + stats.leaves
+    search_seconds = None
+    for k in range(0, rounds):
+        start = time.perf_counter()
+        oskaplayer(board, player, search_depth)
+        seconds = time.perf_counter() - start
+        if search_seconds is None or seconds < search_seconds:
+            search_seconds = seconds
+    tracemalloc.start()
+    oskaplayer(board, player, search_depth)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'cells': sum(len(row) for row in board),
+        'movegen_nodes': movegen_nodes,
+        'movegen_seconds': movegen_seconds,
+        'movegen_nodes_per_second':
+            movegen_nodes / movegen_seconds if movegen_seconds else 0.0,
+        'board_bytes': board_bytes,
+        'search_nodes': nodes,
+        'search_seconds': search_seconds,
+        'search_nodes_per_second':
+            nodes / search_seconds if search_seconds else 0.0,
+        'branching_factor': stats.branching_factor(),
+        'search_peak_bytes': peak,
+    }
+
+
+# This function fits cost = c * n ** k to the measurements of every size with
+# least squares on the logarithms. A cost that grows with the number of cells
+# has k near 2, one that does not depend on the size has k near 0.
+#   @param:
+#   sizes: the board sizes n
+#   costs: the measurement of every size
+#
+#   returns the exponent k
+def growth(sizes, costs):
+    points = [(math.log(n), math.log(cost))
+              for (n, cost) in zip(sizes, costs) if cost > 0]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for (x, y) in points) / len(points)
+    mean_y = sum(y for (x, y) in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for (x, y) in points)
+    return sum((x - mean_x) * (y - mean_y) for (x, y) in points) / spread
+
+
+# This function measures how the costs grow with the board size, on the
+# starting board and on a board from the middle of a game of every size
+#   @param:
+#   sizes: the board sizes n
+#   movegen_depth: the depth of the move generator count
+#   search_depth: the number of steps that the search looks ahead
+#
+#   returns the results as a dict that can be written as JSON: the
+#   measurements of every board, see bench_size, and for every kind of board
+#   the exponent k of the cost per board, see growth
+def scaling(sizes=SCALING_SIZES, movegen_depth=SCALING_MOVEGEN_DEPTH,
+            search_depth=SCALING_SEARCH_DEPTH):
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'sizes': list(sizes),
+        'opening': [],
+        'midgame': [],
+        'growth': {},
+    }
+    for n in sizes:
+        report['opening'].append(bench_size(start_board(n), 'w',
+                                            movegen_depth, search_depth))
+        board, player = midgame_board(n, 2 * n)
+        report['midgame'].append(bench_size(board, player, movegen_depth,
+                                            search_depth))
+
+    for kind in ('opening', 'midgame'):
+        results = report[kind]
+        report['growth'][kind] = {
+            'movegen_seconds_per_node': growth(sizes, [
+                1 / entry['movegen_nodes_per_second'] if
+                entry['movegen_nodes_per_second'] else 0.0
+                for entry in results]),
+            'search_seconds_per_node': growth(sizes, [
+                1 / entry['search_nodes_per_second'] if
+                entry['search_nodes_per_second'] else 0.0
+                for entry in results]),
+            'board_bytes': growth(sizes, [entry['board_bytes']
+                                          for entry in results]),
+            'search_peak_bytes': growth(sizes, [
+                entry['search_peak_bytes'] for entry in results]),
+            'branching_factor': growth(sizes, [entry['branching_factor']
+                                               for entry in results]),
+        }
+    return report
+
+
+# This function compares two benchmark reports. The node counts and the chosen
+# moves do not depend on the speed of the machine, so any difference in them
+# means that the move generator or the search behaves differently now.
+#   @param:
+#   old: the report to compare against
+#   new: the new report
+#   tolerance: the fraction by which a time may grow before it is reported
+#   min_seconds: the shortest time that is compared at all, shorter times are
+#                mostly noise
+#
+#   returns a list of messages, empty if nothing changed
+def compare(old, new, tolerance=0.10, min_seconds=0.01):
+    messages = []
+    old_positions = {}
+    for position in old['positions']:
+        old_positions[position['name']] = position
+    for position in new['positions']:
+        name = position['name']
+        if name not in old_positions:
+            continue
+        for kind, counted in (('movegen', 'nodes'), ('search', 'move')):
+            before = {}
+            for entry in old_positions[name][kind]:
+                before[entry['depth']] = entry
+            for entry in position[kind]:
+                if entry['depth'] not in before:
+                    continue
+                previous = before[entry['depth']]
+                if entry[counted] != previous[counted]:
+                    messages.append("{} {} depth {}: {} changed from {} to {}"
+                                    .format(name, kind, entry['depth'],
+                                            counted, previous[counted],
+                                            entry[counted]))
+                if (previous['seconds'] >= min_seconds and
+                    entry['seconds'] > previous['seconds'] * (1 + tolerance)):
+                    messages.append("{} {} depth {}: {:.4f}s, was {:.4f}s"
+                                    .format(name, kind, entry['depth'],
+                                            entry['seconds'],
+                                            previous['seconds']))
+    return messages
+
+
+# Usage: python benchmark.py [max_depth] > report.json
+#        python benchmark.py compare old.json new.json
+#        python benchmark.py scaling [max_size] > scaling.json
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'scaling':
+        max_size = int(sys.argv[2]) if len(sys.argv) > 2 else SCALING_SIZES[-1]
+        json.dump(scaling(range(SCALING_SIZES[0], max_size + 1)), sys.stdout,
+                  indent=2)
+        print()
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'compare':
+        with open(sys.argv[2]) as old_file, open(sys.argv[3]) as new_file:
+            messages = compare(json.load(old_file), json.load(new_file))
+        for message in messages:
+            print(message)
+        sys.exit(1 if messages else 0)
+
+    max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    json.dump(run(max_depth), sys.stdout, indent=2)
+    print()
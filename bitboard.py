@@ -0,0 +1,134 @@
+from collections import namedtuple
+
+from geometry import geometry
+
+
+# A packed gameboard. Every cell of the board has an index, counted row by row
+# from the top left cell, and the bit with that index is set in white (or
+# black) when the cell holds a white (or black) piece.
+#   white: the bitmask of the cells that hold a white piece
+#   black: the bitmask of the cells that hold a black piece
+#   n: the number of cells in the first row of the board
+Bitboard = namedtuple('Bitboard', ['white', 'black', 'n'])
+
+
+# The layouts that have already been computed, keyed by the board size n
+_layouts = {}
+
+
+# This function computes the move masks of a board of size n from the move
+# tables in geometry once, and returns the cached copy afterwards
+#   @param:
+#   n: the number of cells in the first row of the board
+#
+#   returns a dict with
+#   'widths': the width of every row
+#   'w', 'b': for every cell index, a list of (move mask, over mask) pairs of
+#             the moves of a piece of that player, where the move mask has the
+#             from and to bits set and the over mask is 0 for a simple move
+def layout(n):
+    if n in _layouts:
+        return _layouts[n]
+
+    tables = geometry(n)
+    index = tables['index']
+    result = {'widths': tables['widths']}
+    for player in ('w', 'b'):
+        masks = []
+        for (row, col) in tables['cells']:
+            cell_masks = []
+            for (frm, to, captured) in tables[player][row][col]:
+                move_mask = (1 << index[frm]) | (1 << index[to])
+                over_mask = 0 if captured is None else 1 << index[captured]
+                cell_masks.append((move_mask, over_mask))
+            masks.append(cell_masks)
+        result[player] = masks
+
+    _layouts[n] = result
+    return result
+
+
+# This function converts a gameboard to the packed format
+#   @param:
+#   board: the gameboard in the form of a list of strings or a 2D array
+#
+#   returns the Bitboard of the board
+def to_bitboard(board):
+    white = 0
+    black = 0
+    bit = 1
+    for row in board:
+        for col in row:
+            if col == 'w':
+                white |= bit
+            elif col == 'b':
+                black |= bit
+            bit <<= 1
+    return Bitboard(white, black, len(board[0]))
+
+
+# This function converts a packed board back to a gameboard
+#   @param:
+#   bitboard: the Bitboard of the board
+#
+#   returns the gameboard in the form of a list of strings, like
+#   convert_format
+def to_board(bitboard):
+    result = []
+    bit = 1
+    for width in layout(bitboard.n)['widths']:
+        new_row = ""
+        for col in range(0, width):
+            if bitboard.white & bit:
+                new_row += 'w'
+            elif bitboard.black & bit:
+                new_row += 'b'
+            else:
+                new_row += '-'
+            bit <<= 1
+        result.append(new_row)
+    return result
+
+
+# This function generates all the possible moves that the input player can make
+# on a packed board, in the same order as movegen. A move flips the from and to
+# bits of the player with one XOR, and a jump also clears the bit of the
+# opponent piece that it jumps over.
+#   @param:
+#   bitboard: the Bitboard of the board
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   yields the newly generated Bitboards one at a time
+def bitboard_movegen(bitboard, player):
+    table = layout(bitboard.n)[player]
+    white = bitboard.white
+    black = bitboard.black
+    empty = ~(white | black)
+    if player == 'w':
+        own = white
+        opponent = black
+    else:
+        own = black
+        opponent = white
+
+    pieces = own
+    while pieces:
+        bit = pieces & -pieces
+        pieces ^= bit
+        for (move_mask, over_mask) in table[bit.bit_length() - 1]:
+            # The cell that the piece moves to must be empty, and a jump must
+            # go over a piece of the opponent
+            if not (move_mask ^ bit) & empty:
+                continue
+            if over_mask == 0:
+                new_own = own ^ move_mask
+                new_opponent = opponent
+            elif over_mask & opponent:
+                new_own = own ^ move_mask
+                new_opponent = opponent ^ over_mask
+            else:
+                continue
+            if player == 'w':
+                yield Bitboard(new_own, new_opponent, bitboard.n)
+            else:
+                yield Bitboard(new_opponent, new_own, bitboard.n)
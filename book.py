@@ -0,0 +1,143 @@
+# The opening book. The first moves of every game from a starting board go
+# through the same few boards, so the book searches each of them once, deeper
+# than a player would during a game, and keeps the best move by the hash of
+# the board. A player then looks the move up instead of searching again.
+
+import mmap
+import struct
+import sys
+
+from evaluation import count_pieces
+from evaluation import winner
+from geometry import apply_move
+from geometry import start_board
+from movegen import get_backend
+from oskaplayer import search_root
+from transposition import TranspositionTable
+from transposition import board_hash
+
+
+# The first bytes of a book file, followed by the version
+MAGIC = b'OSKABK'
+VERSION = 1
+HEADER_SIZE = 8
+
+# Every board is one record: its hash with the player to move, see board_hash,
+# the index of its best move in legal_moves and the number of steps that the
+# search looked ahead
+RECORD = struct.Struct('<QBB')
+
+# The sizes of the starting boards that the book covers by default, see
+# start_board, white moves first
+SIZES = (4, 5, 6)
+
+
+# This function searches every board that can come up in the first moves of a
+# game from the given board
+#   @param:
+#   board: the starting gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating who moves first
+#   plies: the number of moves of both players that the book covers
+#   depth: the number of steps that every search looks ahead
+#   entries: an optional dict to add the boards to, so that one book can
+#            cover several starting boards
+#
+#   returns the dict from the hash of every board to its (best move, depth)
+def build(board, player, plies, depth, entries=None):
+    if entries is None:
+        entries = {}
+
+    # One table serves all the searches, most of their boards are the same
+    table = TranspositionTable()
+    boards = [([list(row) for row in board], player)]
+    for ply in range(0, plies):
+        next_boards = []
+        for (cur_board, cur_player) in boards:
+            key = board_hash(cur_board, cur_player)
+            if key in entries:
+                continue
+            next_moves = get_backend().legal_moves(cur_board, cur_player)
+            if next_moves == []:
+                continue
+            best, value = search_root(cur_board, cur_player, depth,
+                                      next_moves, table=table)
+            entries[key] = (best, depth)
+
+            # The boards where the game is over are not played any further
+            opponent = 'w' if cur_player == 'b' else 'b'
+            for move in next_moves:
+                new_board = apply_move(cur_board, move)
+                if winner(*count_pieces(new_board), cur_player) == 0:
+                    next_boards.append((new_board, opponent))
+        boards = next_boards
+    return entries
+
+
+# This function writes a book to a file, sorted by hash
+#   @param:
+#   path: the name of the file
+#   entries: the boards of the book, see build
+def write(path, entries):
+    header = MAGIC + bytes([VERSION])
+    header += bytes(HEADER_SIZE - len(header))
+    with open(path, 'wb') as book_file:
+        book_file.write(header)
+        for key in sorted(entries):
+            best, depth = entries[key]
+            book_file.write(RECORD.pack(key, best, depth))
+
+
+# An opening book read from a file
+class OpeningBook:
+    # This function reads a file that write produced into a dict, so that a
+    # board is found with one lookup
+    #   @param:
+    #   path: the name of the file
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as book_file:
+            data = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                header = data[:HEADER_SIZE]
+                if (header[:len(MAGIC)] != MAGIC or
+                    header[len(MAGIC)] != VERSION or
+                    (len(data) - HEADER_SIZE) % RECORD.size != 0):
+                    raise ValueError("{} is not an opening book".format(path))
+                self.entries = {}
+                for (key, best, depth) in RECORD.iter_unpack(
+                        data[HEADER_SIZE:]):
+                    self.entries[key] = (best, depth)
+            finally:
+                data.close()
+
+    # This function returns the number of boards in the book
+    def __len__(self):
+        return len(self.entries)
+
+    # This function looks up the best move of a board
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #   moves_ahead: the optional number of steps that the player wants to
+    #                look ahead, the book is only used if it looked as far
+    #
+    #   returns the index of the move in the list of legal_moves, or None if
+    #   the board is not in the book
+    def best_move(self, board, player, moves_ahead=None):
+        found = self.entries.get(board_hash(board, player))
+        if found is None:
+            return None
+        if moves_ahead is not None and found[1] < moves_ahead:
+            return None
+        return found[0]
+
+
+# Usage: python book.py path plies depth [size ...]
+if __name__ == '__main__':
+    path, plies, depth = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+    sizes = [int(arg) for arg in sys.argv[4:]] or SIZES
+    entries = {}
+    for size in sizes:
+        build(start_board(size), 'w', plies, depth, entries)
+    write(path, entries)
+    print("{} boards".format(len(entries)))
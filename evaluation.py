@@ -0,0 +1,217 @@
+# The evaluation of a board only depends on four numbers: how many pieces each
+# player has left, and how many steps those pieces still need to reach the
+# starting row of the opponent. This module computes the value of a board and
+# the winner from those numbers, and keeps them up to date move by move.
+
+
+# The value of a board that the endgame table says can be won by force. It is
+# just below the 20 of a board that is already won, so the search takes a move
+# that wins at once over one that only wins later, and puts off a loss that it
+# cannot avoid.
+TABLEBASE_WIN = 19
+
+
+# This function evaluates a board from its piece counts and steps, see
+# board_evaluator in oskaplayer for the reasoning behind the values
+#   @param:
+#   white_count: the number of white pieces
+#   black_count: the number of black pieces
+#   white_step: the number of steps that the white pieces still need
+#   black_step: the number of steps that the black pieces still need
+#   starting_player: the player whose favor we are in to evaluate the board
+#
+#   returns 20 or -20 for a winning situation of either player, and the
+#   difference in steps otherwise
+def score(white_count, black_count, white_step, black_step, starting_player):
+    # If the player that in favor holds the white piece
+    if starting_player == 'w':
+        # If both players have all their pieces in place, we compare the
+        # number of pieces
+        if ((black_step == 0 and white_step == 0) and
+            (black_count != 0 and white_count != 0)):
+            if white_count > black_count:
+               return 20
+            elif white_count < black_count:
+               return -20
+
+        if black_count == 0 or white_step == 0:
+            return 20
+        elif white_count == 0 or black_step == 0:
+            return -20
+        else:
+            return black_step - white_step
+    # If the player that in favor holds the black piece
+    else:
+        # If both players have all their pieces in place, we compare the
+        # number of pieces
+        if ((black_step == 0 and white_step == 0) and
+            (black_count != 0 and white_count != 0)):
+            if white_count > black_count:
+               return -20
+            elif white_count < black_count:
+               return 20
+
+        if white_count == 0 or black_step == 0:
+            return 20
+        elif black_count == 0 or white_step == 0:
+            return -20
+        else:
+            return white_step - black_step
+
+
+# This function determines if there is a win for either player from the piece
+# counts and steps, see check_win in play
+#   @param:
+#   white_count: the number of white pieces
+#   black_count: the number of black pieces
+#   white_step: the number of steps that the white pieces still need
+#   black_step: the number of steps that the black pieces still need
+#   player: the player who has just moved
+#
+#   returns:
+#           1 if the black wins
+#           2 if the white wins
+#           0 if there is not winner currently
+def winner(white_count, black_count, white_step, black_step, player):
+    if player == 'w':
+        if black_count == 0 or white_step == 0:
+            return 2
+        elif white_count == 0 or black_step == 0:
+            return 1
+    else:
+        if white_count == 0 or black_step == 0:
+            return 1
+        elif black_count == 0 or white_step == 0:
+            return 2
+    return 0
+
+
+# This function goes through the board to count the number of pieces and the
+# number of steps for each player
+#   @param:
+#   board: the gameboard in the form of a list of strings or a 2D array
+#
+#   returns the tuple (white_count, black_count, white_step, black_step)
+def count_pieces(board):
+    white_count = 0
+    black_count = 0
+    white_step = 0
+    black_step = 0
+    for i in range(0, len(board)):
+        for j in range(0, len(board[i])):
+            if board[i][j] == 'b':
+                black_count += 1
+                black_step += i
+            if board[i][j] == 'w':
+                white_step += len(board) - i - 1
+                white_count += 1
+    return (white_count, black_count, white_step, black_step)
+
+
+# The piece counts and steps of a board that the search walks through. The
+# board is counted once, and every move and every take-back only changes the
+# numbers of the pieces that it touches.
+class EvalState:
+    __slots__ = ('white_count', 'black_count', 'white_step', 'black_step',
+                 'rows', 'evaluator', 'tablebase', 'stats')
+
+    # This function counts the pieces and steps of the board
+    #   @param:
+    #   board: the gameboard in the form of a list of strings or a 2D array
+    #   evaluator: an optional function with the parameters of score that
+    #              evaluates the boards instead of score
+    #   tablebase: an optional tablebase.Tablebase that gives the exact value
+    #              of the boards with few pieces, see probe
+    #   stats: an optional stats.SearchStats that the search fills in, it
+    #          counts and times the evaluated boards too
+    def __init__(self, board, evaluator=None, tablebase=None, stats=None):
+        (self.white_count, self.black_count,
+         self.white_step, self.black_step) = count_pieces(board)
+        self.rows = len(board)
+        self.evaluator = score if evaluator is None else evaluator
+        self.tablebase = tablebase
+        self.stats = stats
+        if stats is not None:
+            self.evaluator = stats.timed(self.evaluator)
+
+    # This function updates the numbers for a move
+    #   @param:
+    #   move: the Move
+    #   player: the player who makes the move
+    def make(self, move, player):
+        captured = move.captured
+        if player == 'w':
+            self.white_step -= move.to[0] - move.frm[0]
+            if captured is not None:
+                self.black_count -= 1
+                self.black_step -= captured[0]
+        else:
+            self.black_step -= move.frm[0] - move.to[0]
+            if captured is not None:
+                self.white_count -= 1
+                self.white_step -= self.rows - captured[0] - 1
+
+    # This function restores the numbers from before a move
+    #   @param:
+    #   move: the Move that make was called with
+    #   player: the player who made the move
+    def unmake(self, move, player):
+        captured = move.captured
+        if player == 'w':
+            self.white_step += move.to[0] - move.frm[0]
+            if captured is not None:
+                self.black_count += 1
+                self.black_step += captured[0]
+        else:
+            self.black_step += move.frm[0] - move.to[0]
+            if captured is not None:
+                self.white_count += 1
+                self.white_step += self.rows - captured[0] - 1
+
+    # This function evaluates the current board, like board_evaluator unless
+    # another evaluator was given
+    #   @param:
+    #   starting_player: the player whose favor we are in to evaluate the board
+    #
+    #   returns the value of the board
+    def evaluate(self, starting_player):
+        return self.evaluator(self.white_count, self.black_count,
+                              self.white_step, self.black_step,
+                              starting_player)
+
+    # This function determines if there is a win, like check_win
+    #   @param:
+    #   player: the player who has just moved
+    #
+    #   returns 1 if the black wins, 2 if the white wins and 0 otherwise
+    def winner(self, player):
+        return winner(self.white_count, self.black_count,
+                      self.white_step, self.black_step, player)
+
+    # This function looks the current board up in the endgame table
+    #   @param:
+    #   board: the gameboard, which must match the numbers of the state
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #   starting_player: the player whose favor we are in to evaluate the board
+    #
+    #   returns TABLEBASE_WIN or -TABLEBASE_WIN when either player can force a
+    #   win, 0 when neither can, or None when there is no table, it does not
+    #   hold the board, or the move before has already won the game. The table
+    #   only holds the values of games that go on, so a finished board is
+    #   evaluated like it is without a table.
+    def probe(self, board, player, starting_player):
+        if (self.tablebase is None or
+            self.white_count + self.black_count > self.tablebase.pieces):
+            return None
+        if self.winner('w' if player == 'b' else 'b') != 0:
+            return None
+        value = self.tablebase.probe(board, player)
+        if value is None:
+            return None
+        if player != starting_player:
+            value = -value
+        if value > 0:
+            return TABLEBASE_WIN
+        elif value < 0:
+            return -TABLEBASE_WIN
+        return 0
@@ -0,0 +1,262 @@
+# The geometry of the Oska board. The rows of a board of size n shrink by one
+# cell from n down to 2 in the middle row and grow back to n, so a piece steps
+# to a different column depending on which half of the board it is in. All the
+# special cases around the middle row live in step() below, and the move tables
+# of every board size are built from it once and cached.
+
+from collections import namedtuple
+
+
+# A move of one piece. The cells are (row, col) pairs.
+#   frm: the cell that the piece moves from
+#   to: the cell that the piece moves to
+#   captured: the cell of the opponent piece that a jump goes over, or None
+#             for a simple move
+Move = namedtuple('Move', ['frm', 'to', 'captured'])
+
+
+# The geometries that have already been computed, keyed by the board size n
+_geometries = {}
+
+
+# This function returns the width of every row for a board of size n
+#   @param:
+#   n: the number of cells in the first row of the board
+#
+#   returns a list with the number of cells of every row
+def row_widths(n):
+    widths = []
+    for row in range(0, 2 * n - 3):
+        if row <= n - 2:
+            widths.append(n - row)
+        else:
+            widths.append(row - n + 4)
+    return widths
+
+
+# This function returns the starting board of size n: the white pieces fill
+# the first row, the black pieces fill the last row and every other cell is
+# empty
+#   @param:
+#   n: the number of cells in the first row of the board, at least 4
+#
+#   returns the gameboard in the form of a list of strings
+def start_board(n):
+    if n < 4:
+        raise ValueError("the board size must be at least 4, not {}".format(n))
+    widths = row_widths(n)
+    return ['w' * n] + ['-' * width for width in widths[1:-1]] + ['b' * n]
+
+
+# This function returns the cell one row further towards the given direction.
+# In the upper half of the board the rows shrink, so the left neighbour below
+# has the column to the left; in the lower half the rows grow, so the right
+# neighbour below has the column to the right. Moving up is the mirror image.
+# A jump is two steps in the same direction, which also covers the jumps across
+# the middle row.
+#   @param:
+#   widths: the width of every row, see row_widths
+#   row: the row index of the cell
+#   col: the column index of the cell
+#   down: True to step towards the last row, False towards the first row
+#   right: True to step to the right neighbour, False to the left neighbour
+#
+#   returns the (row, col) of the neighbour, or None if it is off the board
+def step(widths, row, col, down, right):
+    middle = len(widths) // 2
+    if down:
+        new_row = row + 1
+        shrinking = row < middle
+    else:
+        new_row = row - 1
+        shrinking = row > middle
+    if new_row < 0 or new_row >= len(widths):
+        return None
+
+    if shrinking:
+        new_col = col if right else col - 1
+    else:
+        new_col = col + 1 if right else col
+    if new_col < 0 or new_col >= widths[new_row]:
+        return None
+    return (new_row, new_col)
+
+
+# This function lists the moves that a piece of the given player can make from
+# a cell, in the same order as white_move and black_move generate them
+#   @param:
+#   widths: the width of every row, see row_widths
+#   row: the row index of the cell
+#   col: the column index of the cell
+#   player: either 'b' or 'w'
+#
+#   returns a list of Moves
+def piece_moves(widths, row, col, player):
+    down = player == 'w'
+    candidates = {}
+    for right in (False, True):
+        over = step(widths, row, col, down, right)
+        side = 'R' if right else 'L'
+        if over is None:
+            continue
+        candidates['f' + side] = Move((row, col), over, None)
+        to = step(widths, over[0], over[1], down, right)
+        if to is not None:
+            candidates['j' + side] = Move((row, col), to, over)
+
+    # The pieces at either end of a row try their simple moves before their
+    # jumps, the other pieces try each direction in turn
+    if col == 0 or col == widths[row] - 1:
+        if player == 'b':
+            names = ['fR', 'fL', 'jR', 'jL']
+        elif col == 0:
+            names = ['fL', 'fR', 'jL', 'jR']
+        else:
+            names = ['fL', 'fR', 'jR', 'jL']
+    else:
+        names = ['fL', 'jL', 'fR', 'jR']
+
+    result = []
+    for name in names:
+        if name in candidates:
+            result.append(candidates[name])
+    return result
+
+
+# This function computes the move tables of a board of size n once, and
+# returns the cached copy afterwards
+#   @param:
+#   n: the number of cells in the first row of the board
+#
+#   returns a dict with
+#   'widths': the width of every row
+#   'cells': the (row, col) of every cell, row by row
+#   'index': the position of every (row, col) in cells
+#   'w', 'b': for every row and column, the tuple of the Moves that a piece of
+#             that player can make from there
+def geometry(n):
+    if n in _geometries:
+        return _geometries[n]
+
+    widths = row_widths(n)
+    cells = []
+    index = {}
+    for row in range(0, len(widths)):
+        for col in range(0, widths[row]):
+            index[(row, col)] = len(cells)
+            cells.append((row, col))
+
+    result = {'widths': widths, 'cells': cells, 'index': index}
+    for player in ('w', 'b'):
+        table = []
+        for row in range(0, len(widths)):
+            table.append([tuple(piece_moves(widths, row, col, player))
+                          for col in range(0, widths[row])])
+        result[player] = table
+
+    _geometries[n] = result
+    return result
+
+
+# This function lists the legal moves of the player by filtering the move
+# tables: the cell that a piece moves to must be empty, and a jump must go over
+# a piece of the opponent
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns a list of Moves in the same order as movegen
+def legal_moves(board, player):
+    table = geometry(len(board[0]))[player]
+    opponent = 'w' if player == 'b' else 'b'
+    result = []
+    for i in range(0, len(board)):
+        row = board[i]
+        for j in range(0, len(row)):
+            if row[j] != player:
+                continue
+            for move in table[i][j]:
+                to = move.to
+                if board[to[0]][to[1]] != '-':
+                    continue
+                captured = move.captured
+                if captured is None or board[captured[0]][captured[1]] == opponent:
+                    result.append(move)
+    return result
+
+
+# This function yields the legal moves of the player one at a time, in the
+# same order as legal_moves. A search that stops after the first few moves of a
+# board does not look for the rest.
+#   @param:
+#   board: the gameboard, which must be the same whenever the next move is
+#          asked for, a move made on it must be taken back first
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   yields the Moves
+def iter_legal_moves(board, player):
+    table = geometry(len(board[0]))[player]
+    opponent = 'w' if player == 'b' else 'b'
+    for i in range(0, len(board)):
+        row = board[i]
+        for j in range(0, len(row)):
+            if row[j] != player:
+                continue
+            for move in table[i][j]:
+                to = move.to
+                if board[to[0]][to[1]] != '-':
+                    continue
+                captured = move.captured
+                if captured is None or board[captured[0]][captured[1]] == opponent:
+                    yield move
+
+
+# This function applies a move to a copy of the board
+#   @param:
+#   board: the gameboard
+#   move: the Move to apply
+#
+#   returns the new gameboard
+def apply_move(board, move):
+    result = [list(row) for row in board]
+    make_move(result, move)
+    return result
+
+
+# This function applies a move to the board in place
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   move: the Move to apply
+def make_move(board, move):
+    frm, to, captured = move
+    board[to[0]][to[1]] = board[frm[0]][frm[1]]
+    board[frm[0]][frm[1]] = '-'
+    if captured is not None:
+        board[captured[0]][captured[1]] = '-'
+
+
+# This function takes back a move that make_move applied to the board
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   move: the Move to take back
+def unmake_move(board, move):
+    frm, to, captured = move
+    piece = board[to[0]][to[1]]
+    board[frm[0]][frm[1]] = piece
+    board[to[0]][to[1]] = '-'
+    if captured is not None:
+        board[captured[0]][captured[1]] = 'w' if piece == 'b' else 'b'
+
+
+# This function generates all the possible moves that the input player can make
+# from the move tables
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns a list of newly generated gameboards
+def table_movegen(board, player):
+    new_boards = []
+    for move in legal_moves(board, player):
+        new_boards.append(apply_move(board, move))
+    return new_boards
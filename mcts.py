@@ -0,0 +1,259 @@
+# The Monte Carlo tree search player. Instead of evaluating the boards with
+# board_evaluator, it plays many random games from the board and grows a tree
+# towards the moves that win the most of them, using the UCT rule to balance
+# the moves that look best against the moves that were tried least. The nodes
+# are stored by the hash of their board, so a board that is reached by two
+# orders of moves is one node, and a tree can be kept from one move to the
+# next.
+
+import math
+import random
+import time
+
+from evaluation import count_pieces
+from evaluation import winner
+from movegen import movegen
+from oskaplayer import convert_format
+from transposition import board_hash
+
+# The result of a game that neither player won
+TIE = -1
+
+
+# A board of the tree with the player to move
+class MCTSNode:
+    __slots__ = ('board', 'player', 'visits', 'value', 'children', 'result')
+
+    # This function creates a node that has not been visited yet
+    #   @param:
+    #   board: the gameboard in the form of a 2D array
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #   result: 1 if the black has won, 2 if the white has won, TIE if the
+    #           game is a tie, or None if the game goes on
+    def __init__(self, board, player, result=None):
+        self.board = board
+        self.player = player
+        self.visits = 0
+        # The sum of the rewards of the games through the node for the player
+        # to move: 1 for a win, 0.5 for a tie and 0 for a loss
+        self.value = 0.0
+        # The list of the (new gameboard, key of the child node) of every move,
+        # or None until the node is expanded
+        self.children = None
+        self.result = result
+
+
+# This function computes the reward of a game for a player
+#   @param:
+#   result: 1 if the black wins, 2 if the white wins, TIE for a tie
+#   player: either 'b' or 'w'
+#
+#   returns 1 for a win, 0.5 for a tie and 0 for a loss
+def reward(result, player):
+    if result == TIE:
+        return 0.5
+    if (result == 2) == (player == 'w'):
+        return 1.0
+    return 0.0
+
+
+# The tree of a Monte Carlo search. It can be kept between the moves of a
+# game, since the boards after the next moves are already in it.
+class MCTSTree:
+    # This function creates an empty tree
+    #   @param:
+    #   exploration: the constant of the UCT rule, a larger value tries the
+    #                less visited moves more often
+    #   max_nodes: the number of nodes after which the tree starts over
+    #   seed: the seed of the random games
+    def __init__(self, exploration=1.4, max_nodes=1 << 18, seed=None):
+        self.exploration = exploration
+        self.max_nodes = max_nodes
+        self.random = random.Random(seed)
+        self.nodes = {}
+
+    # This function returns the node of a board, and creates it if the board
+    # is not in the tree yet
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #   result: the result of the game on the board, see MCTSNode
+    #
+    #   returns the key of the node and the node
+    def node(self, board, player, result=None):
+        key = board_hash(board, player)
+        node = self.nodes.get(key)
+        if node is None:
+            node = MCTSNode(board, player, result)
+            self.nodes[key] = node
+        return (key, node)
+
+    # This function adds the children of a node. A player that cannot move
+    # passes, so the only child is the same board with the opponent to move,
+    # and the game is a tie when the opponent cannot move either.
+    #   @param:
+    #   node: the MCTSNode
+    def expand(self, node):
+        opponent = 'w' if node.player == 'b' else 'b'
+        node.children = []
+        new_boards = movegen(node.board, node.player)
+        if new_boards == []:
+            if movegen(node.board, opponent) == []:
+                node.result = TIE
+            else:
+                node.children.append(
+                    (node.board, self.node(node.board, opponent)[0]))
+            return
+
+        for new_board in new_boards:
+            result = winner(*count_pieces(new_board), node.player)
+            key, child = self.node(new_board, opponent,
+                                   result if result != 0 else None)
+            node.children.append((new_board, key))
+
+    # This function picks the child to visit by the UCT rule. A child that was
+    # never visited goes first.
+    #   @param:
+    #   node: the expanded MCTSNode
+    #
+    #   returns the child node
+    def select(self, node):
+        log_visits = math.log(node.visits) if node.visits > 0 else 0.0
+        best = None
+        best_score = None
+        for (new_board, key) in node.children:
+            child = self.nodes[key]
+            if child.visits == 0:
+                return child
+            # The value of the child is counted for the player to move on the
+            # child board, the opponent of the node
+            if child.player == node.player:
+                mean = child.value / child.visits
+            else:
+                mean = 1.0 - child.value / child.visits
+            score = mean + self.exploration * math.sqrt(log_visits /
+                                                        child.visits)
+            if best is None or score > best_score:
+                best = child
+                best_score = score
+        return best
+
+    # This function plays a random game from a board to its end
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns 1 if the black wins, 2 if the white wins and TIE for a tie
+    def rollout(self, board, player):
+        cur_board = board
+        while True:
+            opponent = 'w' if player == 'b' else 'b'
+            new_boards = movegen(cur_board, player)
+            if new_boards == []:
+                if movegen(cur_board, opponent) == []:
+                    return TIE
+            else:
+                cur_board = self.random.choice(new_boards)
+                result = winner(*count_pieces(cur_board), player)
+                if result != 0:
+                    return result
+            player = opponent
+
+    # This function runs one iteration: it walks down the tree by the UCT
+    # rule to a node that was never visited, plays a random game from there,
+    # and adds the result to every node on the way
+    #   @param:
+    #   root: the MCTSNode of the board to move on
+    def iterate(self, root):
+        path = [root]
+        node = root
+        while node.result is None and node.visits > 0:
+            if node.children is None:
+                self.expand(node)
+                if node.result is not None:
+                    break
+            node = self.select(node)
+            path.append(node)
+
+        if node.result is not None:
+            result = node.result
+        else:
+            result = self.rollout(node.board, node.player)
+        for node in path:
+            node.visits += 1
+            node.value += reward(result, node.player)
+
+    # This function searches a board and picks the move that was visited the
+    # most, the first one in the order of movegen among equal counts
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #   iterations: the number of iterations to run
+    #   time_limit: the number of seconds that the search may take
+    #
+    #   returns the next best move in the form of a gameboard
+    def search(self, board, player, iterations=None, time_limit=None):
+        if len(self.nodes) > self.max_nodes:
+            self.nodes = {}
+        key, root = self.node([list(row) for row in board], player)
+        if root.children is None:
+            self.expand(root)
+
+        # If both players cannot make any moves, then the game has reached a
+        # tie, and if only the player cannot move, the opponent moves next
+        if root.result == TIE:
+            return None
+        if len(root.children) == 1 and root.children[0][0] is root.board:
+            return root.board
+
+        deadline = None
+        if time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        done = 0
+        while True:
+            self.iterate(root)
+            done += 1
+            if iterations is not None and done >= iterations:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        best = None
+        best_visits = -1
+        for (new_board, child_key) in root.children:
+            visits = self.nodes[child_key].visits
+            if visits > best_visits:
+                best = new_board
+                best_visits = visits
+        return best
+
+
+# This function determines the next move for the given player with a Monte
+# Carlo tree search
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   iterations: the number of random games to play
+#   time_limit: the number of seconds that the search may take. With both, the
+#               search stops at whichever comes first.
+#   tree: an optional MCTSTree to search in, which can be kept from one move
+#         to the next so that the next search starts with what this one found
+#   exploration: the constant of the UCT rule when no tree is given
+#   seed: the seed of the random games when no tree is given
+#
+#   returns the next best move in the form of a gameboard
+def mctsplayer(board, player, iterations=None, time_limit=None, tree=None,
+               exploration=1.4, seed=None):
+    if iterations is None and time_limit is None:
+        raise ValueError("mctsplayer needs iterations or time_limit")
+    if tree is None:
+        tree = MCTSTree(exploration, seed=seed)
+
+    ans = tree.search(board, player, iterations, time_limit)
+
+    # If the move determined by the search is none, it means that both players
+    # have reached a tie and the player could not move ahead
+    if ans == None:
+        return None
+
+    return convert_format(ans)
@@ -1,13 +1,268 @@
 import copy
+import os
+import random
+from collections import namedtuple
+
+from bitboard import bitboard_movegen
+from bitboard import to_bitboard
+from bitboard import to_board
+from geometry import Move
+from geometry import apply_move
+from geometry import geometry
+from geometry import iter_legal_moves
+from geometry import legal_moves
+from geometry import row_widths
+from geometry import table_movegen
+
+
+# A move generator that movegen and the search can hand the work to. All the
+# functions take a gameboard and a player, and give the moves in the same
+# order, so the move generators can be swapped without changing any result.
+#   movegen: the function that returns the list of the new gameboards in the
+#            form of 2D arrays
+#   legal_moves: the function that returns the list of the Moves, which the
+#                search makes and takes back
+#   iter_legal_moves: the function that yields the same Moves one at a time
+Backend = namedtuple('Backend', ['movegen', 'legal_moves', 'iter_legal_moves'])
+
+
+# The move generators by name, see register_backend
+_backends = {}
+
+# The move generator that movegen and the search use. The OSKA_MOVEGEN
+# environment variable chooses another one, which also reaches the worker
+# processes.
+_backend_name = os.environ.get('OSKA_MOVEGEN', 'table')
+_backend = None
 
 
 # This function generates all the possible moves that the input player can make
+# with the chosen move generator, see set_backend
 #   @param:
 #   initial_board: the gameboard
 #   player: either 'b' or 'w', indicating whose turn it is
 #
 #   returns a list of newly generated gameboards
 def movegen(initial_board, player):
+    return _backend.movegen(initial_board, player)
+
+
+# This function generates the possible moves of the input player one at a
+# time, in the same order as movegen, so that a caller who stops early does
+# not build the rest of the new boards
+#   @param:
+#   initial_board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   yields the newly generated gameboards
+def iter_movegen(initial_board, player):
+    for move in _backend.iter_legal_moves(initial_board, player):
+        yield apply_move(initial_board, move)
+
+
+# This function adds a move generator that movegen and the search can use
+#   @param:
+#   name: the name of the move generator
+#   generate: the function, with the same parameters and result as movegen
+#   moves: the function that lists the Moves like geometry.legal_moves, or
+#          None to read them off the boards of generate
+#   iter_moves: the function that yields the Moves like
+#               geometry.iter_legal_moves, or None to go through the list of
+#               moves
+def register_backend(name, generate, moves=None, iter_moves=None):
+    if moves is None:
+        def moves(board, player):
+            return board_moves(board, player, generate(board, player))
+    if iter_moves is None:
+        def iter_moves(board, player):
+            return iter(moves(board, player))
+    _backends[name] = Backend(generate, moves, iter_moves)
+
+
+# This function chooses the move generator that movegen and the search use
+# from now on
+#   @param:
+#   name: the name of a registered move generator
+#
+#   returns the name of the move generator that was used before, so that it
+#   can be chosen again afterwards
+def set_backend(name):
+    global _backend, _backend_name
+    if name not in _backends:
+        raise ValueError("unknown move generator {!r}, expected one of {}"
+                         .format(name, backend_names()))
+    previous = _backend_name
+    _backend = _backends[name]
+    _backend_name = name
+    return previous
+
+
+# This function returns a move generator. The search calls it for the Moves of
+# every board, so set_backend also changes the generator of the search.
+#   @param:
+#   name: the name of a registered move generator, or None for the one that
+#         movegen and the search use
+#
+#   returns the Backend
+def get_backend(name=None):
+    if name is None:
+        return _backend
+    if name not in _backends:
+        raise ValueError("unknown move generator {!r}, expected one of {}"
+                         .format(name, backend_names()))
+    return _backends[name]
+
+
+# This function returns the names of the registered move generators
+def backend_names():
+    return sorted(_backends)
+
+
+# This function finds the Moves that lead from a board to the new boards of a
+# move generator: the piece leaves a cell of the player for an empty cell, and
+# a jump empties a cell of the opponent
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   new_boards: the list of the new gameboards
+#
+#   returns the list of Moves in the order of the new boards
+def board_moves(board, player, new_boards):
+    result = []
+    for new_board in new_boards:
+        frm = None
+        to = None
+        captured = None
+        for i in range(0, len(board)):
+            for j in range(0, len(board[i])):
+                if board[i][j] == new_board[i][j]:
+                    continue
+                if board[i][j] == player:
+                    frm = (i, j)
+                elif board[i][j] == '-':
+                    to = (i, j)
+                else:
+                    captured = (i, j)
+        result.append(Move(frm, to, captured))
+    return result
+
+
+# This function generates all the possible moves that the input player can make
+# on the packed board of bitboard, and unpacks the new boards again
+#   @param:
+#   initial_board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns a list of newly generated gameboards
+def packed_movegen(initial_board, player):
+    new_boards = []
+    for new_bitboard in bitboard_movegen(to_bitboard(initial_board), player):
+        new_boards.append([list(row) for row in to_board(new_bitboard)])
+    return new_boards
+
+
+# This function yields the Moves of the packed board of bitboard. The bits that
+# a move flips in the pieces of the player are its from and to cells, and the
+# bit that it clears in the pieces of the opponent is the captured cell.
+#   @param:
+#   initial_board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   yields the Moves in the same order as packed_movegen
+def iter_packed_moves(initial_board, player):
+    bitboard = to_bitboard(initial_board)
+    cells = geometry(bitboard.n)['cells']
+    if player == 'w':
+        own = bitboard.white
+        opponent = bitboard.black
+    else:
+        own = bitboard.black
+        opponent = bitboard.white
+    for new_bitboard in bitboard_movegen(bitboard, player):
+        if player == 'w':
+            new_own = new_bitboard.white
+            new_opponent = new_bitboard.black
+        else:
+            new_own = new_bitboard.black
+            new_opponent = new_bitboard.white
+        frm = own & ~new_own
+        to = new_own & ~own
+        over = opponent ^ new_opponent
+        captured = None
+        if over:
+            captured = cells[over.bit_length() - 1]
+        yield Move(cells[frm.bit_length() - 1], cells[to.bit_length() - 1],
+                   captured)
+
+
+# This function lists the Moves of the packed board of bitboard
+#   @param:
+#   initial_board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns the list of Moves in the same order as packed_movegen
+def packed_moves(initial_board, player):
+    return list(iter_packed_moves(initial_board, player))
+
+
+# This function fills a board of size n with pieces on random cells. The
+# boards do not need to be reachable in a game, so they also cover the corners
+# of the move generators that a game rarely gets to.
+#   @param:
+#   n: the number of cells in the first row of the board
+#   generator: the random.Random to draw from
+#
+#   returns the gameboard in the form of a 2D array
+def random_board(n, generator):
+    board = [['-'] * width for width in row_widths(n)]
+    cells = [(i, j) for i in range(0, len(board))
+             for j in range(0, len(board[i]))]
+    generator.shuffle(cells)
+    white_count = generator.randint(0, n)
+    black_count = generator.randint(0, n)
+    for (i, j) in cells[:white_count]:
+        board[i][j] = 'w'
+    for (i, j) in cells[white_count:white_count + black_count]:
+        board[i][j] = 'b'
+    return board
+
+
+# This function checks that all the move generators give the same boards and
+# the same Moves in the same order on random boards
+#   @param:
+#   count: the number of random boards
+#   sizes: the board sizes to draw from
+#   seed: the seed of the random boards
+#
+#   returns a list of (backend name, board, player) for every board where a
+#   move generator differs from the reference, empty if they all agree
+def compare_backends(count=500, sizes=tuple(range(4, 13)), seed=0):
+    generator = random.Random(seed)
+    mismatches = []
+    for k in range(0, count):
+        board = random_board(generator.choice(sizes), generator)
+        player = generator.choice('wb')
+        expected = reference_movegen(board, player)
+        expected_moves = legal_moves(board, player)
+        for name in backend_names():
+            backend = _backends[name]
+            if (backend.movegen(board, player) != expected or
+                backend.legal_moves(board, player) != expected_moves or
+                list(backend.iter_legal_moves(board, player)) !=
+                expected_moves):
+                mismatches.append((name, board, player))
+    return mismatches
+
+
+# This function generates all the possible moves that the input player can make
+# with white_move and black_move. It is the reference that the move tables in
+# geometry are checked against, and gives the same boards in the same order.
+#   @param:
+#   initial_board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns a list of newly generated gameboards
+def reference_movegen(initial_board, player):
     new_boards = []
 
     # Nested for loop to find all the pieces of the player
@@ -167,7 +422,7 @@ def black_move(board, row, col):
     if col == 0:
         # Move forward
         # If the piece is in the upper half of the board
-        if (row <= (size-1) / 2 and board[row-1][col+1] == '-'):
+        if (row <= (size-1) / 2 and row > 0 and board[row-1][col+1] == '-'):
                 forwards.append(forward(board, row, col, row-1, col+1))
 
         if (row > 0 and board[row-1][0] == '-'):
@@ -303,3 +558,10 @@ def jump(board, old_row, old_col, middle_row, middle_col, new_row, new_col):
     result[middle_row][middle_col] = '-'
     result[new_row][new_col] = board[old_row][old_col]
     return result
+
+
+# The move generators that come with the game
+register_backend('reference', reference_movegen)
+register_backend('table', table_movegen, legal_moves, iter_legal_moves)
+register_backend('bitboard', packed_movegen, packed_moves, iter_packed_moves)
+set_backend(_backend_name)
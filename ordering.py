@@ -0,0 +1,101 @@
+# The move ordering of the alpha-beta search. A search prunes the most when the
+# best move of every board is searched first, so the moves are sorted by how
+# likely they are to be good: jumps first, the ones that take the piece closest
+# to its goal before the others, then the killer moves that cut off the search
+# of another board at the same step, then the moves with the best history, and
+# then the moves that land closest to the goal row. The order of movegen
+# breaks the remaining ties.
+
+
+# The move ordering, which can be passed as the order of alphabeta_search. It
+# learns from the cutoffs of the search, and keeps what it learnt from one
+# search to the next, so it should be kept for all the iterations of an
+# iterative deepening search.
+class MoveOrdering:
+    # This function creates an ordering that has not learnt anything yet
+    #   @param:
+    #   killers: the number of killer moves kept for every step
+    #   captures_first: False to order the jumps like the other moves. With
+    #                   board_evaluator a jump is often not the best move,
+    #                   since taking a piece that is far from its goal lowers
+    #                   the steps of the opponent, see score.
+    def __init__(self, killers=2, captures_first=True):
+        self.slots = killers
+        self.captures_first = captures_first
+        self.clear()
+
+    # This function forgets the killer moves, the history and the counters
+    def clear(self):
+        # The quiet moves that last caused a cutoff, by the step count
+        self.killers = {}
+        # The sum of the squared depths below the boards where a move caused a
+        # cutoff, by the Move
+        self.history = {}
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+
+    # This function orders the moves of a board
+    #   @param:
+    #   board: the gameboard
+    #   next_moves: the list of Moves of the board
+    #   player: the player who makes the moves
+    #   count: the current number of steps that we have already looked through
+    #
+    #   returns the indices of the moves in the order to search them
+    def __call__(self, board, next_moves, player, count):
+        killers = self.killers.get(count, ())
+        history = self.history
+        last_row = len(board) - 1
+        keys = []
+        for i in range(0, len(next_moves)):
+            move = next_moves[i]
+            if player == 'w':
+                distance = last_row - move.to[0]
+            else:
+                distance = move.to[0]
+            captured = move.captured
+            # A jump sorts before the other moves by how close the piece it
+            # takes is to its goal
+            later = not self.captures_first or captured is None
+            if later:
+                victim = 0
+            elif player == 'w':
+                victim = captured[0]
+            else:
+                victim = last_row - captured[0]
+            keys.append((later, victim, move not in killers,
+                         -history.get(move, 0), distance, i))
+        keys.sort()
+        return [key[-1] for key in keys]
+
+    # This function is called by the search when a move cuts off the search of
+    # a board
+    #   @param:
+    #   move: the Move that caused the cutoff
+    #   count: the current number of steps that we have already looked through
+    #   depth: the number of steps that were searched below the board
+    #   position: how many moves of the board were searched before this one
+    def cutoff(self, move, count, depth, position):
+        self.cutoffs += 1
+        if position == 0:
+            self.first_cutoffs += 1
+
+        # A jump goes first anyway, so only the quiet moves become killers
+        if move.captured is None:
+            killers = self.killers.setdefault(count, [])
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[self.slots:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    # This function reports how well the ordering is working
+    #
+    #   returns a dict with the number of cutoffs, how many of them the first
+    #   move caused, and the fraction of those
+    def stats(self):
+        return {
+            'cutoffs': self.cutoffs,
+            'first_cutoffs': self.first_cutoffs,
+            'first_cutoff_rate': (self.first_cutoffs / self.cutoffs
+                                  if self.cutoffs else 0.0),
+        }
@@ -1,13 +1,84 @@
-import copy
+import time
+
+from evaluation import EvalState
+from evaluation import count_pieces
+from evaluation import score
+from geometry import apply_move
+from geometry import make_move
+from geometry import unmake_move
+from movegen import get_backend
+from transposition import EXACT
+from transposition import LOWER
+from transposition import TranspositionTable
+from transposition import UPPER
+from transposition import board_hash
+from transposition import update_hash
+from transposition import zobrist_keys
+
+# The bound that is larger than any value of board_evaluator
+INFINITY = float('inf')
+
+
+# The exception that stops a search when its deadline has passed
+class SearchTimeout(Exception):
+    pass
+
 
 # This function determines the next possible move for the given player
 #   @param:
 #   board: the gameboard in the form of a list of strings
 #   player: either 'b' or 'w', indicating whose turn it is
 #   moves_ahead: the number of steps to look ahead
+#   time_limit: the number of seconds that the search may take. The search
+#               looks 1, 2, 3... steps ahead until the time is up and returns
+#               the move of the deepest search that finished. With moves_ahead
+#               as well, it looks at most moves_ahead steps ahead.
+#   table: an optional TranspositionTable that the search stores the values of
+#          the boards in, it can be kept from one call to the next
+#   workers: the number of processes to split the moves of the board between,
+#            see parallel_search. The worker processes keep their own tables.
+#   evaluator: an optional function with the parameters of evaluation.score
+#              that evaluates the boards instead of board_evaluator. A table
+#              should only be kept between calls with the same evaluator.
+#   order: an optional move ordering for the search in this process, like
+#          ordering.MoveOrdering, see alphabeta_search. It does not change the
+#          move, only how fast it is found.
+#   tablebase: an optional tablebase.Tablebase, or a solver.Solution for
+#              perfect play on a solved board size. A board that it holds is
+#              answered from the table with the best move, and the search
+#              in this process takes the exact value of every board that it
+#              holds instead of the evaluator.
+#   book: an optional book.OpeningBook. A board that it holds is answered with
+#         the move of its search, if that looked at least moves_ahead steps
+#         ahead. The book was searched with board_evaluator, so it is not
+#         used with another evaluator.
+#   stats: an optional stats.SearchStats that the search in this process
+#          fills in, see there. A move from the book or the tablebase leaves
+#          it empty.
 #
 #   returns the next best move in the form of a gameboard
-def oskaplayer(board, player, moves_ahead):
+def oskaplayer(board, player, moves_ahead=None, time_limit=None, table=None,
+               workers=None, evaluator=None, order=None, tablebase=None,
+               book=None, stats=None):
+    return oskaplayer_value(board, player, moves_ahead, time_limit, table,
+                            workers, evaluator, order, tablebase, book,
+                            stats)[0]
+
+
+# This function determines the next move like oskaplayer, and also gives the
+# value that the search found for the board
+#   @param: see oskaplayer
+#
+#   returns the next best move in the form of a gameboard, and the value of
+#   the board for the player: the value of the search, or of the tablebase
+#   like in the search. The value is None when the move comes from the book
+#   or the player cannot move.
+def oskaplayer_value(board, player, moves_ahead=None, time_limit=None,
+                     table=None, workers=None, evaluator=None, order=None,
+                     tablebase=None, book=None, stats=None):
+    if moves_ahead is None and time_limit is None:
+        raise ValueError("oskaplayer needs moves_ahead or time_limit")
+
     # Convert the input board to a 2D array
     initial_board = []
     for i in range(0, len(board)):
@@ -16,15 +87,137 @@ def oskaplayer(board, player, moves_ahead):
             new_row.append(board[i][j])
         initial_board.append(new_row)
 
-    # Use the minimax search to obtain the next best move
-    ans = minmax(initial_board, player, moves_ahead)
+    # An opening book or an endgame table knows the best move without a search
+    if book is not None and evaluator is None:
+        best = book.best_move(initial_board, player, moves_ahead)
+        if best is not None:
+            next_moves = get_backend().legal_moves(initial_board, player)
+            return (convert_format(apply_move(initial_board,
+                                              next_moves[best])), None)
+    if tablebase is not None:
+        best = tablebase.best_move(initial_board, player)
+        if best is not None:
+            next_moves = get_backend().legal_moves(initial_board, player)
+            value = EvalState(initial_board, tablebase=tablebase).probe(
+                initial_board, player, player)
+            return (convert_format(apply_move(initial_board,
+                                              next_moves[best])), value)
+
+    # Use the alpha-beta search to obtain the next best move, it returns the
+    # same move as the minimax search but visits far fewer boards
+    if time_limit is not None:
+        ans, value = deepening_value(initial_board, player, time_limit,
+                                     moves_ahead, order, table, workers,
+                                     evaluator, tablebase, stats)
+    elif workers is not None and workers > 1:
+        # parallel imports the search from this module, so it is imported here
+        from parallel import parallel_value
+        ans, value = parallel_value(initial_board, player, moves_ahead,
+                                    workers, evaluator=evaluator)
+    else:
+        ans, value = alphabeta_value(initial_board, player, moves_ahead,
+                                     order, table, evaluator=evaluator,
+                                     tablebase=tablebase, stats=stats)
 
     # If the move determined by the search is none, it means that both players
     # have reached a tie and the player could not move ahead
     if ans == None:
-        return None
+        return (None, None)
+
+    return (convert_format(ans), value)
+
 
-    return convert_format(ans)
+
+
+# This function looks 1, 2, 3... steps ahead with the alpha-beta search until
+# the time is up. Every search stores its values in a transposition table, so
+# the next one tries the best moves that were found so far first.
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   time_limit: the number of seconds that the search may take
+#   max_moves: the optional largest number of steps to look ahead
+#   order: the optional move ordering function, see alphabeta_search
+#   table: an optional TranspositionTable, a new one is used without it
+#   workers: the optional number of processes for every search after the
+#            first one, see parallel_search
+#   evaluator: the optional evaluator, see oskaplayer
+#   tablebase: the optional endgame table, see oskaplayer. The processes of
+#              parallel_search do not use it.
+#   stats: the optional statistics, see oskaplayer. The processes of
+#          parallel_search do not fill them in.
+#   deadline: an optional deadline to stop at instead of time_limit seconds
+#             from now, which may be any object that compares with
+#             time.perf_counter() like ponder.StopDeadline. It cannot be used
+#             with workers.
+#
+#   returns the move of the deepest search that finished in the form of a
+#   gameboard. The search that looks one step ahead always finishes.
+def iterative_deepening(board, player, time_limit, max_moves=None, order=None,
+                        table=None, workers=None, evaluator=None,
+                        tablebase=None, stats=None, deadline=None):
+    return deepening_value(board, player, time_limit, max_moves, order, table,
+                           workers, evaluator, tablebase, stats, deadline)[0]
+
+
+# This function looks ahead like iterative_deepening, and also gives the value
+# that the deepest search that finished found for the board
+#   @param: see iterative_deepening
+#
+#   returns the move in the form of a gameboard and the value of the board
+#   for the player, see alphabeta_value
+def deepening_value(board, player, time_limit, max_moves=None, order=None,
+                    table=None, workers=None, evaluator=None, tablebase=None,
+                    stats=None, deadline=None):
+    if deadline is None:
+        deadline = time.perf_counter() + time_limit
+    if table is None:
+        table = TranspositionTable()
+
+    limit = line_limit(board)
+    if max_moves is not None and max_moves < limit:
+        limit = max_moves
+
+    moves = 1
+    best = alphabeta_value(board, player, moves, order, table,
+                           evaluator=evaluator, tablebase=tablebase,
+                           stats=stats)
+    while moves < limit and time.perf_counter() < deadline:
+        try:
+            if workers is not None and workers > 1:
+                from parallel import parallel_value
+                best = parallel_value(board, player, moves + 1, workers,
+                                      deadline - time.perf_counter(),
+                                      evaluator)
+            else:
+                best = alphabeta_value(board, player, moves + 1, order,
+                                       table, deadline, evaluator, tablebase,
+                                       stats)
+        except SearchTimeout:
+            break
+        moves += 1
+    return best
+
+
+
+
+# This function computes the number of steps after which looking further
+# ahead cannot change a search. Every move brings a piece at least one row
+# closer to the other side, so no line of play is longer than the number of
+# rows left to go.
+#   @param:
+#   board: the gameboard
+#
+#   returns the number of steps
+def line_limit(board):
+    limit = 1
+    for i in range(0, len(board)):
+        for j in range(0, len(board[i])):
+            if board[i][j] == 'w':
+                limit += len(board) - i - 1
+            elif board[i][j] == 'b':
+                limit += i
+    return limit
 
 
 
@@ -34,86 +227,108 @@ def oskaplayer(board, player, moves_ahead):
 #   board: the gameboard in the form of a list of strings
 #   player: either 'b' or 'w', indicating whose turn it is
 #   moves: the number of steps to look ahead
+#   table: an optional TranspositionTable that keeps the values of the boards
+#          that have already been searched, so that a board reached through
+#          another order of moves is not searched again
+#   evaluator: the optional evaluator, see oskaplayer
+#   stats: the optional statistics, see oskaplayer
 #
 #   returns the next best move in the form of a gameboard
-def minmax(board, player, moves):
+def minmax(board, player, moves, table=None, evaluator=None, stats=None):
     # count records the current number of steps that we have searched
     count = 1
 
+    # The hash of the board also depends on the player in whose favor the
+    # values are computed
+    key = None
+    if table is not None:
+        key = search_hash(board, player, player)
+
     # Employes a depth-first search algorithm to carry out the search
-    # and we obtained the index of the best move among all the possible moves
-    best = dfs(board, player, count, moves, player)
-    next_moves = movegen(board, player)
+    # and we obtained the index of the best move among all the possible moves.
+    # The search makes and takes back its moves on a copy of the board.
+    work_board = [list(row) for row in board]
+    if stats is not None:
+        stats.watch(table)
+    best = dfs(work_board, player, count, moves, player, table, key,
+               EvalState(work_board, evaluator, stats=stats))
+    if stats is not None:
+        stats.finish(board, player, moves, best)
 
     # If there is not any move that the player can make
-    if next_moves == []:
+    if best is None:
         # If both players cannot make any moves, then the game has reached a tie
-        if movegen(board, 'w' if player=='b' else 'b') == []:
+        if next(get_backend().iter_legal_moves(board,
+                                               'w' if player=='b' else 'b'),
+                None) is None:
             return None
         # Else we let the opponent player make the next move
         return board
 
-    return next_moves[best]
+    return apply_move(board, best)
 
 
 
 
 # This function carrys out a depth-first search with minimax algorithm to
-# determine the next best move
+# determine the next best move. The whole search walks the tree on one board:
+# it makes every move in place, searches the board below it and takes the move
+# back again, so the board is unchanged when the function returns.
 #   @param:
-#   board: the gameboard in the form of a list of strings
+#   board: the gameboard in the form of a 2D array
 #   player: either 'b' or 'w', indicating whose turn it is
 #   count: the current number of steps that we have already looked through
 #   moves: the total number of steps to look ahead
 #   starting_player: the player whose favor we are in to evaluate the board
+#   table: the optional TranspositionTable, see minmax
+#   key: the hash of the board when a table is given, see search_hash
+#   state: the EvalState of the board, which is kept up to date along with the
+#          board so that the boards are evaluated without counting the pieces
 #
 #   returns
 #   (1): when we are still searching level by level, this function returns the
 #        evaluator value returned by the child node to the parent node
 #   (2): when we have finished searching and evaluating the entire search tree,
-#        this function returns the index of the best move in the list of all
-#        possible moves
-def dfs(board, player, count, moves, starting_player):
-    new_boards = movegen(board, player)
-
-    # If we have reached the max depth to look ahead, we stop generating new
-    # boards, we evaluate all the boards
+#        this function returns the best Move, or None if the player cannot
+#        move
+def dfs(board, player, count, moves, starting_player, table=None, key=None,
+        state=None):
+    if state is None:
+        state = EvalState(board)
+    stats = state.stats
+    if stats is not None:
+        stats.visit(count)
+
+    # If the board has already been searched to the same depth, we reuse the
+    # value of that search
+    if table is not None and count > 1:
+        entry = table.probe(key)
+        if entry is not None and entry[1] == moves - count and entry[3] == EXACT:
+            return entry[2]
+
+    if stats is None:
+        next_moves = get_backend().legal_moves(board, player)
+    else:
+        next_moves = stats.legal_moves(board, player)
 
     # If there is no further moves that can be made from the current board,
     # we evaluate the current board and return the value to the parent node
-    if new_boards == []:
-        return board_evaluator(board, starting_player)
+    if next_moves == []:
+        if count == 1:
+            return None
+        return state.evaluate(starting_player)
 
     # If we have reached the lowest level of the search tree (leaf nodes),
-    # we stop generating new boards and evaluate all the leaf nodes (boards)
+    # we evaluate all the boards that the moves lead to. Only the piece counts
+    # and steps are needed for that, so the board itself is left alone.
+    values = []
     if count == moves:
-        values = []
-        for new_board in new_boards:
-            values.append(board_evaluator(new_board, starting_player))
+        for move in next_moves:
+            state.make(move, player)
+            values.append(state.evaluate(starting_player))
+            state.unmake(move, player)
 
-        # If we have finished evaluting all the boards and need to return the
-        # correct index of the next move
-        if count == 1:
-            max_value = values[0]
-            result = 0
-            for i in range(0, len(values)):
-                if max_value < values[i]:
-                    max_value = values[i]
-                    result = i
-            return result
-
-        # Or if we still need to return a evaluted value to the parent node and
-        # have not reached the root
-        else:
-            if values == []:
-                pass
-            elif (moves % 2 == 0):
-                return min(values)
-            else:
-                return max(values)
-
-    # We have not yet reached the max depth, we continue to go deeper by
-    # generating new boards
+    # We have not yet reached the max depth, we continue to go deeper
     else:
         # Here we also need to alternate to the opponent player
         new_player = player
@@ -121,31 +336,366 @@ def dfs(board, player, count, moves, starting_player):
             new_player = 'b'
         else:
             new_player = 'w'
-        values = []
-        for new_board in new_boards:
-            cur_val = dfs(new_board, new_player, count+1, moves, starting_player)
+        keys = None
+        if table is not None:
+            keys = zobrist_keys(len(board[0]))
+        for move in next_moves:
+            new_key = None
+            if table is not None:
+                new_key = update_hash(key, keys, player, move)
+            make_move(board, move)
+            state.make(move, player)
+            cur_val = dfs(board, new_player, count+1, moves, starting_player,
+                          table, new_key, state)
+            state.unmake(move, player)
+            unmake_move(board, move)
             values.append(cur_val)
 
-        # If we have finished evaluting all the boards and need to return the
-        # correct index of the next move
-        if count == 1:
-            max_value = values[0]
-            result = 0
-            for i in range(len(values)):
-                if max_value < values[i]:
-                    max_value = values[i]
-                    result = i
-            return result
-
-        # Or if we still need to return a evaluted value to the parent node and
-        # have not reached the root
+    # If we have finished evaluting all the boards and need to return the
+    # next move
+    if count == 1:
+        max_value = values[0]
+        result = 0
+        for i in range(len(values)):
+            if max_value < values[i]:
+                max_value = values[i]
+                result = i
+        if table is not None:
+            table.store(key, moves - count, max_value, EXACT, result)
+        return next_moves[result]
+
+    # Or if we still need to return a evaluted value to the parent node and
+    # have not reached the root
+    if (count % 2 == 0):
+        value = min(values)
+    else:
+        value = max(values)
+    if table is not None:
+        table.store(key, moves - count, value, EXACT, values.index(value))
+    return value
+
+
+
+
+# This function employs the alpha-beta search to find the next best move.
+# It returns the same move as minmax for the same number of steps, but it
+# skips the branches that can no longer change the decision at the root.
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to look ahead
+#   order: an optional function that takes the board, the list of its Moves,
+#          the player who makes them and the current step count, and returns
+#          the indices of the moves in the order in which they should be
+#          searched, like ordering.MoveOrdering. If it has a cutoff method,
+#          that is called whenever a move cuts off the search of a board.
+#   table: the optional TranspositionTable, see minmax
+#   deadline: an optional time.perf_counter() value after which the search
+#             gives up and raises SearchTimeout
+#   evaluator: the optional evaluator, see oskaplayer
+#   tablebase: the optional endgame table, see oskaplayer
+#   stats: the optional statistics, see oskaplayer
+#
+#   returns the next best move in the form of a gameboard
+def alphabeta_search(board, player, moves, order=None, table=None,
+                     deadline=None, evaluator=None, tablebase=None,
+                     stats=None):
+    return alphabeta_value(board, player, moves, order, table, deadline,
+                           evaluator, tablebase, stats)[0]
+
+
+# This function searches like alphabeta_search, and also gives the value that
+# the search found for the board
+#   @param: see alphabeta_search
+#
+#   returns the next best move in the form of a gameboard, and the value of
+#   the board for the player, or None when the player cannot move
+def alphabeta_value(board, player, moves, order=None, table=None,
+                    deadline=None, evaluator=None, tablebase=None,
+                    stats=None):
+    backend = get_backend()
+    next_moves = backend.legal_moves(board, player)
+
+    # If there is not any move that the player can make
+    if next_moves == []:
+        # If both players cannot make any moves, then the game has reached a tie
+        if backend.legal_moves(board, 'w' if player=='b' else 'b') == []:
+            return (None, None)
+        # Else we let the opponent player make the next move
+        return (board, None)
+
+    best, value = search_root(board, player, moves, next_moves, None, order,
+                              table, deadline, evaluator, tablebase, stats)
+    if stats is not None:
+        stats.finish(board, player, moves, next_moves[best])
+    return (apply_move(board, next_moves[best]), value)
+
+
+
+
+# This function searches the moves of the root board for alphabeta_search. It
+# can be limited to some of the moves, so that the moves can be split between
+# several searches whose results are combined afterwards.
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to look ahead
+#   next_moves: the list of Moves of the board
+#   candidates: the indices of the moves to search, or None for all of them
+#   order: the optional move ordering function, see alphabeta_search
+#   table: the optional TranspositionTable, see minmax
+#   deadline: the optional time limit, see alphabeta_search
+#   evaluator: the optional evaluator, see oskaplayer
+#   tablebase: the optional endgame table, see oskaplayer
+#   stats: the optional statistics, see oskaplayer
+#
+#   returns the index of the first best move in the order of movegen among
+#   the searched moves and its value
+def search_root(board, player, moves, next_moves, candidates=None, order=None,
+                table=None, deadline=None, evaluator=None, tablebase=None,
+                stats=None):
+    new_player = 'w' if player == 'b' else 'b'
+    work_board = [list(row) for row in board]
+    state = EvalState(work_board, evaluator, tablebase, stats)
+    if stats is not None:
+        stats.visit(1)
+        stats.watch(table)
+    key = None
+    keys = None
+    first = None
+    if table is not None:
+        key = search_hash(board, player, player)
+        keys = zobrist_keys(len(board[0]))
+        entry = table.probe(key)
+        if entry is not None:
+            first = entry[4]
+    indices = search_order(work_board, next_moves, player, 1, order, first)
+    if candidates is not None:
+        indices = [i for i in indices if i in candidates]
+
+    # The root keeps the first best move in the order of movegen, like dfs.
+    # A move is only searched with a window that decides whether it beats the
+    # best value so far, and a move that comes earlier in movegen than the
+    # current best is searched again with a full window when it may tie.
+    best = None
+    best_value = None
+    for i in indices:
+        new_key = None
+        if table is not None:
+            new_key = update_hash(key, keys, player, next_moves[i])
+        make_move(work_board, next_moves[i])
+        state.make(next_moves[i], player)
+        if best is None:
+            value = alphabeta(work_board, new_player, 2, moves, player,
+                              -INFINITY, INFINITY, order, table, new_key,
+                              deadline, state)
         else:
-            if values == []:
-                pass
-            elif (count % 2 == 0):
-                return min(values)
-            else:
-                return max(values)
+            value = alphabeta(work_board, new_player, 2, moves, player,
+                              best_value, INFINITY, order, table, new_key,
+                              deadline, state)
+            if value == best_value and i < best:
+                value = alphabeta(work_board, new_player, 2, moves, player,
+                                  -INFINITY, INFINITY, order, table, new_key,
+                                  deadline, state)
+        state.unmake(next_moves[i], player)
+        unmake_move(work_board, next_moves[i])
+        if (best is None or value > best_value or
+            (value == best_value and i < best)):
+            best = i
+            best_value = value
+
+    # Only the search of all the moves knows the value of the board
+    if table is not None and candidates is None:
+        table.store(key, moves - 1, best_value, EXACT, best)
+    return (best, best_value)
+
+
+
+
+# This function carrys out a fail-soft alpha-beta search, it returns the same
+# value as dfs whenever that value lies between alpha and beta, and otherwise a
+# bound on the other side of the window. Like dfs, it makes and takes back its
+# moves on the one board.
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   count: the current number of steps that we have already looked through
+#   moves: the total number of steps to look ahead
+#   starting_player: the player whose favor we are in to evaluate the board
+#   alpha: the value that the starting player is already guaranteed
+#   beta: the value that the opponent player is already guaranteed
+#   order: the optional move ordering function, see alphabeta_search
+#   table: the optional TranspositionTable, see minmax
+#   key: the hash of the board when a table is given, see search_hash
+#   deadline: the optional time limit, see alphabeta_search
+#   state: the EvalState of the board, see dfs. If it has an endgame table,
+#          a board that the table holds is not searched any further, and if
+#          it has statistics, the search fills them in.
+#
+#   returns the evaluator value of the board
+def alphabeta(board, player, count, moves, starting_player, alpha, beta,
+              order=None, table=None, key=None, deadline=None, state=None):
+    if state is None:
+        state = EvalState(board)
+    stats = state.stats
+    if stats is not None:
+        stats.visit(count)
+
+    tablebase = state.tablebase
+    if tablebase is not None:
+        value = state.probe(board, player, starting_player)
+        if value is not None:
+            if stats is not None:
+                stats.tablebase_hits += 1
+            return value
+
+    # The boards below the max depth are the leaf nodes
+    if count > moves:
+        return state.evaluate(starting_player)
+
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+
+    # A stored value can answer the search if it is exact, or if it is a bound
+    # that already falls outside of the window
+    first = None
+    if table is not None:
+        entry = table.probe(key)
+        if entry is not None:
+            if entry[1] == moves - count and (
+                entry[3] == EXACT or
+                (entry[3] == LOWER and entry[2] >= beta) or
+                (entry[3] == UPPER and entry[2] <= alpha)):
+                return entry[2]
+            first = entry[4]
+
+    # Without an order to sort them in, the moves are generated one at a time,
+    # so a cutoff skips generating the rest of them. The statistics time the
+    # generation of all the moves at once.
+    if order is None and first is None and stats is None:
+        candidates = enumerate(get_backend().iter_legal_moves(board, player))
+    else:
+        if stats is None:
+            next_moves = get_backend().legal_moves(board, player)
+        else:
+            next_moves = stats.legal_moves(board, player)
+        indices = search_order(board, next_moves, player, count, order, first)
+        candidates = [(i, next_moves[i]) for i in indices]
+
+    new_player = 'w' if player == 'b' else 'b'
+    keys = None
+    if table is not None:
+        keys = zobrist_keys(len(board[0]))
+    old_alpha = alpha
+    old_beta = beta
+    best = 0
+
+    # An ordering that learns from the search is told about every cutoff
+    cutoff = getattr(order, 'cutoff', None)
+
+    # The starting player picks the maximum on the odd steps and the opponent
+    # player picks the minimum on the even steps
+    maximizing = count % 2 == 1
+    value = -INFINITY if maximizing else INFINITY
+    searched = False
+    for position, (i, move) in enumerate(candidates):
+        searched = True
+        state.make(move, player)
+        if count == moves:
+            cur_val = None
+            if tablebase is not None:
+                make_move(board, move)
+                cur_val = state.probe(board, new_player, starting_player)
+                unmake_move(board, move)
+            if cur_val is None:
+                cur_val = state.evaluate(starting_player)
+        else:
+            new_key = None
+            if table is not None:
+                new_key = update_hash(key, keys, player, move)
+            make_move(board, move)
+            cur_val = alphabeta(board, new_player, count+1, moves,
+                                starting_player, alpha, beta, order, table,
+                                new_key, deadline, state)
+            unmake_move(board, move)
+        state.unmake(move, player)
+        if maximizing:
+            if cur_val > value:
+                value = cur_val
+                best = i
+                if value > alpha:
+                    alpha = value
+        elif cur_val < value:
+            value = cur_val
+            best = i
+            if value < beta:
+                beta = value
+        if alpha >= beta:
+            if cutoff is not None:
+                cutoff(move, count, moves - count, position)
+            if stats is not None:
+                stats.cutoffs += 1
+            break
+
+    # If there is no further moves that can be made from the current board,
+    # we evaluate the current board like dfs does
+    if not searched:
+        return state.evaluate(starting_player)
+
+    if table is not None:
+        if value <= old_alpha:
+            bound = UPPER
+        elif value >= old_beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        table.store(key, moves - count, value, bound, best)
+    return value
+
+
+
+
+# This function decides the order in which the moves are searched. The best
+# move that a transposition table stored for the board goes first, and the rest
+# follow the ordering function, or the order of movegen without one.
+#   @param:
+#   board: the gameboard
+#   next_moves: the list of Moves of the board
+#   player: the player who makes the moves
+#   count: the current number of steps that we have already looked through
+#   order: the optional move ordering function, see alphabeta_search
+#   first: the index of the stored best move, or None
+#
+#   returns the indices of the moves in the order to search them
+def search_order(board, next_moves, player, count, order, first):
+    if order is None:
+        indices = range(len(next_moves))
+    else:
+        indices = order(board, next_moves, player, count)
+    if first is None or first >= len(next_moves):
+        return indices
+
+    result = [first]
+    for i in indices:
+        if i != first:
+            result.append(i)
+    return result
+
+
+# This function computes the hash under which a board is stored in a
+# transposition table. Since the values of board_evaluator depend on the player
+# in whose favor the board is evaluated, the hash depends on that player too.
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   starting_player: the player whose favor we are in to evaluate the board
+#
+#   returns the 64 bit hash
+def search_hash(board, player, starting_player):
+    key = board_hash(board, player)
+    if starting_player == 'b':
+        key ^= zobrist_keys(len(board[0]))['perspective']
+    return key
 
 
 
@@ -171,56 +721,11 @@ def dfs(board, player, count, moves, starting_player):
 #        this function returns the index of the best move in the list of all
 #        possible moves
 def board_evaluator(board, starting_player):
-    white_count = 0
-    black_count = 0
-    white_step = 0
-    black_step = 0
-
     # Goes through the board to count the number of pieces and the number of
     # steps for each player
-    for i in range(0, len(board)):
-        for j in range(0, len(board[i])):
-            if board[i][j] == 'b':
-                black_count += 1
-                black_step += i
-            if board[i][j] == 'w':
-                white_step += len(board) - i - 1
-                white_count += 1
-
-    # If the player that in favor holds the white piece
-    if starting_player == 'w':
-        # If both players have all their pieces in place, we compare the
-        # number of pieces
-        if ((black_step == 0 and white_step == 0) and
-            (black_count != 0 and white_count != 0)):
-            if white_count > black_count:
-               return 20
-            elif white_count < black_count:
-               return -20
-
-        if black_count == 0 or white_step == 0:
-            return 20
-        elif white_count == 0 or black_step == 0:
-            return -20
-        else:
-            return black_step - white_step
-    # If the player that in favor holds the black piece
-    else:
-        # If both players have all their pieces in place, we compare the
-        # number of pieces
-        if ((black_step == 0 and white_step == 0) and
-            (black_count != 0 and white_count != 0)):
-            if white_count > black_count:
-               return -20
-            elif white_count < black_count:
-               return 20
-
-        if white_count == 0 or black_step == 0:
-            return 20
-        elif black_count == 0 or white_step == 0:
-            return -20
-        else:
-            return white_step - black_step
+    white_count, black_count, white_step, black_step = count_pieces(board)
+    return score(white_count, black_count, white_step, black_step,
+                 starting_player)
 
 
 
@@ -270,316 +775,6 @@ def max(list):
 
 
 
-
-
-# This function generates all the possible moves that the input player can make
-#   @param:
-#   initial_board: the gameboard
-#   player: either 'b' or 'w', indicating whose turn it is
-#
-#   returns a list of newly generated gameboards
-def movegen(initial_board, player):
-    new_boards = []
-
-    # Nested for loop to find all the pieces of the player
-    for i in range(0, len(initial_board)):
-        for j in range(0, len(initial_board[i])):
-            if initial_board[i][j] == player:
-                result = move(initial_board, i, j)
-                for board in result:
-                    new_boards.append(board)
-    return new_boards
-
-
-# This function determines whether the player is white or black and returns the
-# corresponding new boards
-#   @param:
-#   board: the gameboard
-#   row: the row index of the piece that will be moved
-#   col: the column index of the piece that will be moved
-#
-#   returns a list of newly generated gameboards
-def move(board, row, col):
-    if board[row][col] == 'w':
-        return white_move(board, row, col)
-    else:
-        return black_move(board, row, col)
-
-
-# This function generates all the new boards when the player holds white
-#   @param:
-#   board: the gameboard
-#   row: the row index of the piece that will be moved
-#   col: the column index of the piece that will be moved
-#
-#   returns a list of newly generated gameboards
-def white_move(board, row, col):
-    size = len(board)
-    forwards = []
-
-    # If the piece is on the first of that row
-    if col == 0:
-        # Move forward
-        if (row < size-1 and board[row+1][0] == '-'):
-            forwards.append(forward(board, row, col, row+1, 0))
-        # If the piece is in the lower half of the board
-        if (row >= (size-1) / 2 and row < size-1
-            and board[row+1][col+1] == '-'):
-            forwards.append(forward(board, row, col, row+1, col+1))
-
-        # Jump forward
-        # If the piece is in the upper half of the board
-        if (row < (size - 2) and row != (size-1) / 2 - 1 and
-            board[row+1][0] == 'b' and
-            board[row+2][0] == '-'):
-            forwards.append(jump(board, row, col, row+1, 0, row+2, 0))
-        # If the piece is on the line right above the middle line
-        if (row == (size-1) / 2 - 1 and
-            board[row+1][0] == 'b' and
-            board[row+2][1] == '-'):
-            forwards.append(jump(board, row, col, row+1, 0, row+2, 1))
-        # If the piece is in the lower half of the board
-        if (row >= (size-1) / 2 and row < size-2
-            and board[row+1][col+1] == 'b' and board[row+2][col+2] == '-'):
-            forwards.append(jump(board, row, col, row+1, col+1, row+2, col+2))
-
-    # if the piece is on the last of that row
-    elif col == len(board[row])-1:
-        # Move forward
-        # If the piece is in the upper half of the board
-        if (row < (size-1) / 2 and board[row+1][col-1] == '-'):
-            forwards.append(forward(board, row, col, row+1, col-1))
-        # If the piece is in the lower half of the board
-        if (row >= (size-1) / 2 and row < size-1):
-            if board[row+1][col] == '-':
-                forwards.append(forward(board, row, col, row+1, col))
-            if board[row+1][col+1] == '-':
-                forwards.append(forward(board, row, col, row+1, col+1))
-
-        # Jump forward
-        # If the piece is in the upper half of the board
-        if (row < (size-1) / 2 - 1 and
-            board[row+1][col-1] == 'b' and
-            board[row+2][col-2] == '-'):
-            forwards.append(jump(board, row, col, row+1, col-1, row+2, col-2))
-        # If the piece is on the line right above the middle line
-        if (row == (size-1) / 2 - 1 and
-            board[row+1][col-1] == 'b' and
-            board[row+2][col-1] == '-'):
-            forwards.append(jump(board, row, col, row+1, col-1, row+2, col-1))
-        # If the piece is in the lower half of the board
-        if (row >= (size-1) / 2 and row < size-2):
-            if (board[row+1][col+1] == 'b' and board[row+2][col+2] == '-'):
-                forwards.append(jump(board, row, col, row+1, col+1, row+2, col+2))
-            if (board[row+1][col] == 'b' and board[row+2][col] == '-'):
-                forwards.append(jump(board, row, col, row+1, col, row+2, col))
-
-    # If the piece is in the middle of that row, it can move forward in
-    # two directions
-    else:
-        # If the piece is in the upper half of the board
-        if row < (size-1) / 2:
-            # Move forward to the left
-            if board[row+1][col-1] == '-':
-                forwards.append(forward(board, row, col, row+1, col-1))
-            # Jump to the left
-            if (col > 1 and board[row+1][col-1] == 'b' and board[row+2][col-2] == '-'):
-                forwards.append(jump(board, row, col, row+1, col-1, row+2, col-2))
-            # If the piece is on the line right above the middle line
-            if (col == 1 and row == ((size-1) / 2 - 1)
-                and board[row+1][col-1] == 'b'
-                and board[row+2][col-1] == '-'):
-                forwards.append(jump(board, row, col, row+1, col-1, row+2, col-1))
-
-            # Move forward to the right
-            if board[row+1][col] == '-':
-                forwards.append(forward(board, row, col, row+1, col))
-            # Jump to the right
-            if (len(board[row+2]) > col and row != ((size-1) / 2 - 1) and
-                board[row+1][col] == 'b' and board[row+2][col] == '-'):
-                forwards.append(jump(board, row, col, row+1, col, row+2, col))
-            # If the piece is on the line right above the middle line
-            if (len(board[row+2]) > (col+1) and row == ((size-1) / 2 - 1)
-                and board[row+1][col] == 'b'
-                and board[row+2][col+1] == '-'):
-                forwards.append(jump(board, row, col, row+1, col, row+2, col+1))
-
-        # If the piece is in the lower half of the board
-        else:
-            # Move forward to the left
-            if (row < size-1 and board[row+1][col] == '-'):
-                forwards.append(forward(board, row, col, row+1, col))
-            # Jump to the left
-            if (row < size-2 and board[row+1][col] == 'b' and board[row+2][col] == '-'):
-                forwards.append(jump(board, row, col, row+1, col, row+2, col))
-
-            # Move forward to the right
-            if (row < size-1 and board[row+1][col+1] == '-'):
-                forwards.append(forward(board, row, col, row+1, col+1))
-            # Jump to the right
-            if (row < size-2 and
-                board[row+1][col+1] == 'b' and board[row+2][col+2] == '-'):
-                forwards.append(jump(board, row, col, row+1, col+1, row+2, col+2))
-    return forwards
-
-
-# This function generates all the new boards when the player holds white
-#   @param:
-#   board: the gameboard
-#   row: the row index of the piece that will be moved
-#   col: the column index of the piece that will be moved
-#
-#   returns a list of newly generated gameboards
-def black_move(board, row, col):
-    size = len(board)
-    forwards = []
-
-    # if the piece is on the first of that row
-    if col == 0:
-        # Move forward
-        # If the piece is in the upper half of the board
-        if (row <= (size-1) / 2 and board[row-1][col+1] == '-'):
-                forwards.append(forward(board, row, col, row-1, col+1))
-
-        if (row > 0 and board[row-1][0] == '-'):
-            forwards.append(forward(board, row, col, row-1, 0))
-
-        # Jump forward
-        # If the piece is in the upper half of the board, it can jump right
-        if (row <= (size-1) / 2 and row > 1
-            and board[row-1][col+1] == 'w' and board[row-2][col+2] == '-'):
-            forwards.append(jump(board, row, col, row-1, col+1, row-2, col+2))
-        # If the piece is not on the line below the middle and jumps left
-        if (row != (size-1) / 2 + 1 and row > 1 and
-            board[row-1][0] == 'w' and
-            board[row-2][0] == '-'):
-            forwards.append(jump(board, row, col, row-1, 0, row-2, 0))
-        # If the piece is on the line right below the middle line
-        if (row == ((size-1) / 2 + 1) and
-            board[row-1][0] == 'w' and
-            board[row-2][1] == '-'):
-            forwards.append(jump(board, row, col, row-1, 0, row-2, 1))
-
-    # if the piece is on the last of that row
-    elif col == len(board[row])-1:
-        # Move forward
-        # If the piece is in the upper half of the board
-        if row <= (size-1) / 2 and row >= 1:
-            if board[row-1][col+1] == '-':
-                forwards.append(forward(board, row, col, row-1, col+1))
-            if board[row-1][col] == '-':
-                forwards.append(forward(board, row, col, row-1, col))
-        # If the piece is in the lower half of the board
-        if (row > (size-1) / 2 and board[row-1][col-1] == '-'):
-            forwards.append(forward(board, row, col, row-1, col-1))
-
-        # Jump forward
-        # If the piece is in the upper half of the board, it can jump left
-        if (row <= (size-1) / 2 and row > 1):
-            if (board[row-1][col+1] == 'w' and board[row-2][col+2] == '-'):
-                forwards.append(jump(board, row, col, row-1, col+1, row-2, col+2))
-            if (board[row-1][col] == 'w' and board[row-2][col] == '-'):
-                forwards.append(jump(board, row, col, row-1, col, row-2, col))
-        # If the piece is in the lower half of the board
-        if (row > ((size-1) / 2 + 1)
-            and board[row-1][col-1] == 'w'
-            and board[row-2][col-2] == '-'):
-            forwards.append(jump(board, row, col, row-1, col-1, row-2, col-2))
-        # If the piece is on the line right below the middle line
-        if (row == ((size-1) / 2 + 1)
-            and board[row-1][col-1] == 'w'
-            and board[row-2][col-1] == '-'):
-            forwards.append(jump(board, row, col, row-1, col-1, row-2, col-1))
-
-    # If the piece is in the middle of that row, it can move forward in
-    # two directions
-    else:
-        # If the piece is in the upper half of the board
-        if row < (size-1) / 2:
-            # Move forward to the left
-            if row > 0 and board[row-1][col] == '-':
-                forwards.append(forward(board, row, col, row-1, col))
-            # Jump to the left
-            if (row > 1 and board[row-1][col] == 'w' and board[row-2][col] == '-'):
-                forwards.append(jump(board, row, col, row-1, col, row-2, col))
-
-            # Move forward to the right
-            if row > 0 and board[row-1][col+1] == '-':
-                 forwards.append(forward(board, row, col, row-1, col+1))
-            # Jump to the right
-            if (row > 1 and
-                board[row-1][col+1] == 'w' and board[row-2][col+2] == '-'):
-                forwards.append(jump(board, row, col, row-1, col+1, row-2, col+2))
-
-        # If the piece is in the lower half of the board
-        else:
-            # Move forward to the left
-            if board[row-1][col-1] == '-':
-                forwards.append(forward(board, row, col, row-1, col-1))
-            # Jump to the left
-            if (col > 1 and board[row-1][col-1] == 'w' and board[row-2][col-2] == '-'):
-                forwards.append(jump(board, row, col, row-1, col-1, row-2, col-2))
-            # If the piece is on the line right below the middle line
-            if (col == 1 and row == ((size-1) / 2 + 1)
-                and board[row-1][col-1] == 'w'
-                and board[row-2][col-1] == '-'):
-                forwards.append(jump(board, row, col, row-1, col-1, row-2, col-1))
-
-            # Move forward to the right
-            if board[row-1][col] == '-':
-                forwards.append(forward(board, row, col, row-1, col))
-            # Jump to the right
-            if (len(board[row-2]) > col and row != ((size-1) / 2 + 1) and
-                board[row-1][col] == 'w' and board[row-2][col] == '-'):
-                forwards.append(jump(board, row, col, row-1, col, row-2, col))
-            # If the piece is on the line right below the middle line
-            if (row == ((size-1) / 2 + 1) and len(board[row-2]) > (col+1)
-                and board[row-1][col] == 'w'
-                and board[row-2][col+1] == '-'):
-                forwards.append(jump(board, row, col, row-1, col, row-2, col+1))
-    return forwards
-
-
-# This function moves the piece from the old position to the new position
-#   @param:
-#   board: the gameboard
-#   old_row: the row index of the piece that will be moved
-#   old_col: the column index of the piece that will be moved
-#   new_row: the row index of the place that the piece will be moved to
-#   new_col: the column index of the place that the piece will be moved to
-#
-#   returns the new gameboard
-def forward(board, old_row, old_col, new_row, new_col):
-    result = copy.deepcopy(board)
-    result[old_row][old_col] = '-'
-    result[new_row][new_col] = board[old_row][old_col]
-    return result
-
-
-# This function moves the piece from the old position to the new position,
-# jumping over the opponent's piece in the middle
-#   @param:
-#   board: the gameboard
-#   old_row: the row index of the piece that will be moved
-#   old_col: the column index of the piece that will be moved
-#   middle_row: the row index of the piece that will be removed by this jump
-#   middle_col: the column index of the piece that will be removed by this jump
-#   new_row: the row index of the place that the piece will be moved to
-#   new_col: the column index of the place that the piece will be moved to
-#
-#   returns the new gameboard
-def jump(board, old_row, old_col, middle_row, middle_col, new_row, new_col):
-    result = copy.deepcopy(board)
-    result[old_row][old_col] = '-'
-    result[middle_row][middle_col] = '-'
-    result[new_row][new_col] = board[old_row][old_col]
-    return result
-
-
-
-
-
-
 # Below is the code that I used to test the winning rate of the oskaplayer
 # with my current heuristics, depending on the value of the number of steps
 # to look ahead, the winning rate that I obtained is 90% in the range
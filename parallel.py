@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from geometry import apply_move
+from movegen import get_backend
+from oskaplayer import alphabeta_search
+from oskaplayer import search_root
+from transposition import TranspositionTable
+
+
+# The worker processes are started once and kept for the following searches,
+# so a search does not pay for starting them
+_pool = None
+_pool_workers = 0
+
+# The transposition table of a worker process. It is kept from one search to
+# the next, so that a worker starts with the boards it has already searched,
+# as long as the boards are evaluated by the same evaluator.
+_worker_table = None
+_worker_evaluator = None
+
+
+# This function returns the pool of worker processes, and starts it if there is
+# no pool with enough workers yet
+#   @param:
+#   workers: the number of worker processes that are needed
+#
+#   returns the ProcessPoolExecutor
+def get_pool(workers):
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers < workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+# This function stops the worker processes
+def shutdown_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown()
+    _pool = None
+    _pool_workers = 0
+
+
+# This function runs in a worker process and searches some of the moves of the
+# root board
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to look ahead
+#   candidates: the indices of the moves to search
+#   time_limit: the number of seconds that the search may take, or None
+#   evaluator: the optional evaluator, see oskaplayer
+#
+#   returns the index of the best of these moves and its value, see
+#   search_root. It raises SearchTimeout if the time is up.
+def search_chunk(board, player, moves, candidates, time_limit, evaluator):
+    global _worker_table, _worker_evaluator
+    if _worker_table is None or _worker_evaluator is not evaluator:
+        _worker_table = TranspositionTable()
+        _worker_evaluator = evaluator
+    deadline = None
+    if time_limit is not None:
+        deadline = time.perf_counter() + time_limit
+    next_moves = get_backend().legal_moves(board, player)
+    return search_root(board, player, moves, next_moves, set(candidates),
+                       None, _worker_table, deadline, evaluator)
+
+
+# This function employs the alpha-beta search with the moves of the root board
+# split between worker processes. Every worker finds the first best move among
+# its own moves, and the best of those is the same move that alphabeta_search
+# finds on its own.
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to look ahead
+#   workers: the number of worker processes, the number of cores without it
+#   time_limit: the number of seconds that the search may take, or None
+#   evaluator: the optional evaluator, see oskaplayer
+#
+#   returns the next best move in the form of a gameboard. It raises
+#   SearchTimeout if the time was up before every worker finished.
+def parallel_search(board, player, moves, workers=None, time_limit=None,
+                    evaluator=None):
+    return parallel_value(board, player, moves, workers, time_limit,
+                          evaluator)[0]
+
+
+# This function searches like parallel_search, and also gives the value that
+# the search found for the board
+#   @param: see parallel_search
+#
+#   returns the next best move in the form of a gameboard, and the value of
+#   the board for the player, or None when the player cannot move
+def parallel_value(board, player, moves, workers=None, time_limit=None,
+                   evaluator=None):
+    backend = get_backend()
+    next_moves = backend.legal_moves(board, player)
+
+    # If there is not any move that the player can make
+    if next_moves == []:
+        # If both players cannot make any moves, then the game has reached a tie
+        if backend.legal_moves(board, 'w' if player=='b' else 'b') == []:
+            return (None, None)
+        # Else we let the opponent player make the next move
+        return (board, None)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > len(next_moves):
+        workers = len(next_moves)
+
+    # The moves are dealt out in turn, so that every worker gets some of the
+    # moves at the front of movegen and some at the back
+    pool = get_pool(workers)
+    futures = []
+    for k in range(0, workers):
+        candidates = list(range(k, len(next_moves), workers))
+        futures.append(pool.submit(search_chunk, board, player, moves,
+                                   candidates, time_limit, evaluator))
+
+    best = None
+    best_value = None
+    for future in futures:
+        i, value = future.result()
+        if (best is None or value > best_value or
+            (value == best_value and i < best)):
+            best = i
+            best_value = value
+    return (apply_move(board, next_moves[best]), best_value)
+
+
+# This function compares the time of the serial and the parallel search
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   depths: the numbers of steps to look ahead
+#   workers: the number of worker processes
+def benchmark(board, depths, workers):
+    initial_board = [list(row) for row in board]
+
+    # The first call starts the worker processes, which is not what we measure.
+    # The serial search keeps a table from one depth to the next as well, like
+    # the workers do.
+    parallel_search(initial_board, 'w', 1, workers)
+    table = TranspositionTable()
+    for moves in depths:
+        start = time.perf_counter()
+        serial = alphabeta_search(initial_board, 'w', moves, table=table)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = parallel_search(initial_board, 'w', moves, workers)
+        parallel_time = time.perf_counter() - start
+
+        print("depth {}: serial {:.3f}s, {} workers {:.3f}s, speedup {:.2f}, "
+              "same move: {}".format(moves, serial_time, workers,
+                                     parallel_time, serial_time / parallel_time,
+                                     serial == result))
+
+
+# Usage: python parallel.py [workers] [depth ...]
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count() or 1
+    depths = [int(arg) for arg in sys.argv[2:]] or [4, 5, 6, 7, 8]
+    board6 = ['wwwwww','-----','----','---','--','---','----','-----','bbbbbb']
+    benchmark(board6, depths, workers)
+    shutdown_pool()
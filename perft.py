@@ -0,0 +1,177 @@
+import sys
+import time
+
+from geometry import make_move
+from geometry import start_board
+from geometry import unmake_move
+from movegen import compare_backends
+from movegen import get_backend
+from movegen import movegen
+
+
+# The number of boards that white and black reach from the starting boards,
+# see start_board, with white to move, after 1, 2, 3... moves. They were
+# counted with the move tables and checked against reference_movegen, and the
+# larger boards against the bitboard move generator as well.
+GOLDEN_COUNTS = {
+    4: [6, 36, 168, 784, 3376, 13584, 53704, 200272, 679936],
+    5: [8, 64, 432, 2916, 18036, 111556, 665388, 3958276],
+    6: [10, 100, 880, 7744, 63184, 515524, 4046648],
+    7: [12, 144, 1560, 16900],
+    8: [14, 196, 2520, 32400],
+    9: [16, 256, 3808, 56644],
+    10: [18, 324, 5472, 92416],
+    11: [20, 400, 7560, 142884],
+    12: [22, 484, 10120, 211600],
+}
+
+# This function counts the boards that the move generator reaches in the given
+# number of moves. Like in chess, a board where the player cannot move ends its
+# line and is not counted, and no move checks for a win, so the count only
+# depends on the move generator.
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   depth: the number of moves to make
+#   generate: the move generator, a function like movegen that returns the
+#             list of the new gameboards
+#
+#   returns the number of boards at that depth
+def perft(board, player, depth, generate=movegen):
+    if depth == 0:
+        return 1
+    new_boards = generate(board, player)
+    if depth == 1:
+        return len(new_boards)
+
+    new_player = 'w' if player == 'b' else 'b'
+    nodes = 0
+    for new_board in new_boards:
+        nodes += perft(new_board, new_player, depth - 1, generate)
+    return nodes
+
+
+# This function counts like perft, but makes and takes back the Moves of the
+# move generator of the search on the one board like the search does, without
+# building a new board for every move. It measures the move generation of the
+# search.
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   depth: the number of moves to make
+#
+#   returns the number of boards at that depth
+def perft_moves(board, player, depth):
+    if depth == 0:
+        return 1
+    next_moves = get_backend().legal_moves(board, player)
+    if depth == 1:
+        return len(next_moves)
+
+    new_player = 'w' if player == 'b' else 'b'
+    nodes = 0
+    for move in next_moves:
+        make_move(board, move)
+        nodes += perft_moves(board, new_player, depth - 1)
+        unmake_move(board, move)
+    return nodes
+
+
+# This function splits the count of perft between the moves of the board, so a
+# difference between two move generators can be followed down to the move
+# that causes it
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   depth: the number of moves to make, counting the first one
+#   generate: the move generator, see perft
+#
+#   returns a list of (new gameboard, count) pairs in the order of the moves
+def divide(board, player, depth, generate=movegen):
+    new_player = 'w' if player == 'b' else 'b'
+    result = []
+    for new_board in generate(board, player):
+        result.append((new_board, perft(new_board, new_player, depth - 1,
+                                        generate)))
+    return result
+
+
+# This function checks a move generator against the golden counts
+#   @param:
+#   generate: the move generator, see perft
+#   max_depth: the deepest count to check on every board
+#
+#   returns a list of (size, depth, expected, counted) for every count that
+#   differs, empty if the move generator agrees
+def verify(generate=movegen, max_depth=5):
+    mismatches = []
+    for size in sorted(GOLDEN_COUNTS):
+        board = [list(row) for row in start_board(size)]
+        for depth in range(1, min(max_depth, len(GOLDEN_COUNTS[size])) + 1):
+            counted = perft(board, 'w', depth, generate)
+            expected = GOLDEN_COUNTS[size][depth - 1]
+            if counted != expected:
+                mismatches.append((size, depth, expected, counted))
+    return mismatches
+
+
+# This function counts the boards at every depth and prints the counts with
+# the number of boards generated per second
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   depth: the deepest count
+#   generate: the move generator, see perft, or None to make and take back the
+#             moves like the search does
+def report(board, player, depth, generate=None):
+    work_board = [list(row) for row in board]
+    for d in range(1, depth + 1):
+        start = time.perf_counter()
+        if generate is None:
+            nodes = perft_moves(work_board, player, d)
+        else:
+            nodes = perft(work_board, player, d, generate)
+        seconds = time.perf_counter() - start
+        print("depth {}: {} boards in {:.3f}s, {:.0f} boards/s".format(
+            d, nodes, seconds, nodes / seconds if seconds else 0.0))
+
+
+# Usage: python perft.py size depth [backend]
+#        python perft.py divide size depth [backend]
+#        python perft.py verify [max_depth] [backend]
+#        python perft.py compare [count]
+# where backend is the name of a move generator, see movegen.set_backend
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if args and args[0] == 'compare':
+        count = int(args[1]) if len(args) > 1 else 500
+        mismatches = compare_backends(count)
+        for (name, board, player) in mismatches:
+            print("{} differs on {} with {} to move".format(
+                name, '/'.join(''.join(row) for row in board), player))
+        print("ok" if mismatches == [] else "FAILED")
+        sys.exit(1 if mismatches else 0)
+    elif args and args[0] == 'verify':
+        max_depth = int(args[1]) if len(args) > 1 else 5
+        generate = get_backend(args[2]).movegen if len(args) > 2 else movegen
+        mismatches = verify(generate, max_depth)
+        for (size, depth, expected, counted) in mismatches:
+            print("size {} depth {}: expected {}, counted {}".format(
+                size, depth, expected, counted))
+        print("ok" if mismatches == [] else "FAILED")
+        sys.exit(1 if mismatches else 0)
+    elif args and args[0] == 'divide':
+        size, depth = int(args[1]), int(args[2])
+        generate = get_backend(args[3]).movegen if len(args) > 3 else movegen
+        total = 0
+        board = [list(row) for row in start_board(size)]
+        for new_board, count in divide(board, 'w', depth, generate):
+            print("{} {}".format('/'.join(''.join(row) for row in new_board),
+                                 count))
+            total += count
+        print("total {}".format(total))
+    else:
+        size = int(args[0]) if args else 6
+        depth = int(args[1]) if len(args) > 1 else 5
+        generate = get_backend(args[2]).movegen if len(args) > 2 else None
+        report(start_board(size), 'w', depth, generate)
@@ -1,65 +1,33 @@
 from oskaplayer import oskaplayer
 from oskaplayer import convert_format
 from movegen import movegen
+from evaluation import count_pieces
+from evaluation import winner
+from tournament import PlayerConfig
+from tournament import RANDOM_PLAYER
+from tournament import tournament
 import random
 
 
 # This function test the winning rate of the oskaplayer agains a random_player
-# Here, we only tested with three board examples with 100 test cases.
+# Here, we play 100 games on each of the three board examples, spread over all
+# the cores, see tournament.
 #   @param:
-#
-#   returns:
-#           1 if the black wins
-#           2 if the white wins
-#           -1 f there is a tie
-def mass_game():
-    board4 = ['wwww','---','--','---','bbbb'];
-    board5 = ['wwwww','----','---','--','---','----','bbbbb'];
-    board6 = ['wwwwww','-----','----','---','--','---','----','-----','bbbbbb'];
-
-    total_game = 100
-
-    # board4
-    white_win_count = 0
-    i = 0
-
-    while i < total_game:
-        i += 1
-        result = game(board4)
-        if result == 2:
-            white_win_count += 1
-        elif result == -1:
-            i -= 1
-
-    print("BOARD4 white win rate = {}".format(white_win_count/total_game))
-
-    # board5
-    white_win_count = 0
-    i = 0
-
-    while i < total_game:
-        i += 1
-        result = game(board5)
-        if result == 2:
-            white_win_count += 1
-        elif result == -1:
-            i -= 1
-
-    print("BOARD5 white win rate = {}".format(white_win_count/total_game))
-
-    # board6
-    white_win_count = 0
-    i = 0
-
-    while i < total_game:
-        i += 1
-        result = game(board6)
-        if result == 2:
-            white_win_count += 1
-        elif result == -1:
-            i -= 1
-
-    print("BOARD6 white win rate = {}".format(white_win_count/total_game))
+#   total_game: the number of games on each board
+#   workers: the number of worker processes, the number of cores without it
+#   seed: the seed of the random player, so that a run can be repeated
+def mass_game(total_game=100, workers=None, seed=0):
+    # Here, I have tested with different values, including 1, 2, 3, 4...
+    white = PlayerConfig('search', 2)
+    summary = tournament([4, 5, 6], white, RANDOM_PLAYER, total_game,
+                         workers, seed)
+
+    for size in sorted(summary):
+        result = summary[size]
+        low, high = result['win_interval']
+        print("BOARD{} white win rate = {:.2f} (95% CI {:.2f}-{:.2f}), "
+              "tie rate = {:.2f}".format(size, result['win_rate'], low, high,
+                                         result['tie_rate']))
 
 
 # This function determines if there is a win for either player
@@ -123,27 +91,5 @@ def random_player(board):
 #           2 if the white wins
 #           0 if there is not winner currently
 def check_win(board, player):
-    white_count = 0
-    black_count = 0
-    white_step = 0
-    black_step = 0
-    for i in range(0, len(board)):
-        for j in range(0, len(board[i])):
-            if board[i][j] == 'b':
-                black_count += 1
-                black_step += i
-            if board[i][j] == 'w':
-                white_step += len(board) - i - 1
-                white_count += 1
-
-    if player == 'w':
-        if black_count == 0 or white_step == 0:
-            return 2
-        elif white_count == 0 or black_step == 0:
-            return 1
-    else:
-        if white_count == 0 or black_step == 0:
-            return 1
-        elif black_count == 0 or white_step == 0:
-            return 2
-    return 0
+    white_count, black_count, white_step, black_step = count_pieces(board)
+    return winner(white_count, black_count, white_step, black_step, player)
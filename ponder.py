@@ -0,0 +1,215 @@
+# The player that keeps thinking between its moves. It keeps its transposition
+# table, or its Monte Carlo tree, from one move to the next, and while the
+# opponent is thinking it searches the boards that the opponent can move to in
+# a background thread ("pondering"). When its turn comes, the board that the
+# opponent left is one of them, and the search starts from that work.
+#
+# The background thread holds the interpreter lock while it searches, so it
+# only adds thinking time when the opponent thinks in another process or is a
+# person, like in a long running game session.
+
+import math
+import threading
+
+from evaluation import count_pieces
+from evaluation import winner
+from geometry import apply_move
+from mcts import MCTSTree
+from mcts import mctsplayer
+from movegen import get_backend
+from oskaplayer import SearchTimeout
+from oskaplayer import alphabeta_search
+from oskaplayer import line_limit
+from oskaplayer import oskaplayer
+from transposition import TranspositionTable
+from transposition import board_hash
+
+
+# The deadline of a search that is stopped by an event instead of the clock.
+# The search compares time.perf_counter() with its deadline, and this deadline
+# counts as passed as soon as the event is set.
+class StopDeadline:
+    # @param:
+    # event: the threading.Event that stops the search
+    def __init__(self, event):
+        self.event = event
+
+    # time.perf_counter() > deadline
+    def __lt__(self, now):
+        return self.event.is_set()
+
+    # time.perf_counter() < deadline
+    def __gt__(self, now):
+        return not self.event.is_set()
+
+
+# A player that keeps its search between moves and ponders during the turns of
+# the opponent
+class PonderingPlayer:
+    # This function creates the player
+    #   @param:
+    #   moves_ahead: the number of steps to look ahead, see oskaplayer
+    #   time_limit: the number of seconds that a move may take, see oskaplayer
+    #   evaluator: the optional evaluator, see oskaplayer
+    #   order: the optional move ordering, see oskaplayer
+    #   tablebase: the optional endgame table, see oskaplayer
+    #   engine: 'search' for the alpha-beta search of oskaplayer, or 'mcts' for
+    #           the Monte Carlo tree search of mcts.mctsplayer
+    #   iterations: the number of iterations of the 'mcts' engine, which uses
+    #               time_limit as well
+    #   seed: the seed of the random games of the 'mcts' engine
+    def __init__(self, moves_ahead=None, time_limit=None, evaluator=None,
+                 order=None, tablebase=None, engine='search', iterations=None,
+                 seed=None):
+        if engine == 'search':
+            if moves_ahead is None and time_limit is None:
+                raise ValueError("PonderingPlayer needs moves_ahead or "
+                                 "time_limit")
+        elif engine == 'mcts':
+            if iterations is None and time_limit is None:
+                raise ValueError("PonderingPlayer needs iterations or "
+                                 "time_limit")
+        else:
+            raise ValueError("unknown engine {!r}".format(engine))
+        self.moves_ahead = moves_ahead
+        self.time_limit = time_limit
+        self.evaluator = evaluator
+        self.order = order
+        self.tablebase = tablebase
+        self.engine = engine
+        self.iterations = iterations
+        self.table = TranspositionTable()
+        self.tree = MCTSTree(seed=seed)
+
+        # The moves that the pondering found for the boards that the opponent
+        # can move to, by their hash: (steps looked ahead, next gameboard),
+        # with math.inf steps for a move from the tablebase
+        self.answers = {}
+        # The number of moves that were answered from the pondering
+        self.ponder_hits = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    # This function determines the next move, and starts pondering on the
+    # board after it
+    #   @param:
+    #   board: the gameboard in the form of a list of strings
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns the next best move in the form of a gameboard, like oskaplayer
+    def move(self, board, player):
+        self.stop()
+        if self.engine == 'mcts':
+            ans = mctsplayer(board, player, self.iterations, self.time_limit,
+                             self.tree)
+        else:
+            ans = self.search(board, player)
+        self.answers = {}
+
+        # There is nothing to ponder on when the game is over
+        if ans is not None and winner(*count_pieces(ans), player) == 0:
+            self.start(ans, player)
+        return ans
+
+    # This function searches a board with the table of the player, and takes
+    # the move that the pondering already found if it looked far enough ahead
+    #   @param:
+    #   board: the gameboard in the form of a list of strings
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns the next best move in the form of a gameboard
+    def search(self, board, player):
+        if self.time_limit is None:
+            found = self.answers.get(board_hash(board, player))
+            if found is not None and found[0] >= self.moves_ahead:
+                self.ponder_hits += 1
+                return found[1]
+        return oskaplayer(board, player, self.moves_ahead, self.time_limit,
+                          self.table, evaluator=self.evaluator,
+                          order=self.order, tablebase=self.tablebase)
+
+    # This function starts pondering on the board that the opponent moves on
+    #   @param:
+    #   board: the gameboard in the form of a list of strings
+    #   player: the player of this object, whose opponent moves next
+    def start(self, board, player):
+        self.stop_event = threading.Event()
+        if self.engine == 'mcts':
+            target = self.ponder_tree
+        else:
+            target = self.ponder_search
+        self.thread = threading.Thread(
+            target=target, args=(board, player, self.stop_event), daemon=True)
+        self.thread.start()
+
+    # This function stops the pondering and waits for the thread to finish.
+    # It should be called when the game is over.
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    # This function ponders with the alpha-beta search. It searches the board
+    # after every move of the opponent 1, 2, 3... steps ahead, for the player,
+    # so that the values go into the table under the keys that the next search
+    # looks up. A board that the tablebase holds is answered from it, like
+    # oskaplayer does, at any number of steps.
+    #   @param:
+    #   board: the gameboard that the opponent moves on
+    #   player: the player of this object
+    #   stop_event: the threading.Event that stops the pondering
+    def ponder_search(self, board, player, stop_event):
+        opponent = 'w' if player == 'b' else 'b'
+        initial_board = [list(row) for row in board]
+        boards = []
+        next_moves = get_backend().legal_moves(initial_board, opponent)
+        for move in next_moves:
+            new_board = apply_move(initial_board, move)
+            if winner(*count_pieces(new_board), opponent) == 0:
+                boards.append(new_board)
+        if next_moves == []:
+            boards.append(initial_board)
+
+        replies = []
+        for reply in boards:
+            best = None
+            if self.tablebase is not None:
+                best = self.tablebase.best_move(reply, player)
+            if best is None:
+                replies.append(reply)
+            else:
+                next_moves = get_backend().legal_moves(reply, player)
+                ans = apply_move(reply, next_moves[best])
+                self.answers[board_hash(reply, player)] = (
+                    math.inf, [''.join(row) for row in ans])
+
+        limit = line_limit(initial_board)
+        if self.moves_ahead is not None and self.moves_ahead < limit:
+            limit = self.moves_ahead
+        deadline = StopDeadline(stop_event)
+        for moves in range(1, limit + 1):
+            for reply in replies:
+                try:
+                    ans = alphabeta_search(reply, player, moves, self.order,
+                                           self.table, deadline,
+                                           self.evaluator, self.tablebase)
+                except SearchTimeout:
+                    return
+                if ans is not None:
+                    ans = [''.join(row) for row in ans]
+                self.answers[board_hash(reply, player)] = (moves, ans)
+
+    # This function ponders with the Monte Carlo tree search. The nodes keep
+    # the values for the player to move on them, so the iterations from the
+    # board of the opponent grow the tree under the boards that the player will
+    # move on.
+    #   @param: see ponder_search
+    def ponder_tree(self, board, player, stop_event):
+        opponent = 'w' if player == 'b' else 'b'
+        key, root = self.tree.node([list(row) for row in board], opponent)
+        if root.children is None:
+            self.tree.expand(root)
+        while (root.result is None and not stop_event.is_set() and
+               len(self.tree.nodes) <= self.tree.max_nodes):
+            self.tree.iterate(root)
@@ -0,0 +1,291 @@
+# The regression check of the search. minmax, and alphabeta_search with or
+# without a transposition table, a move ordering, statistics or worker
+# processes, are meant to choose the same move as the minimax search of the
+# first version of oskaplayer, the first best move in the order of movegen.
+# That search is kept here as it was, on the lists of new boards of
+# reference_movegen, so that it does not change along with the others. This
+# plays random boards through all of them and reports every board where one
+# chose another move, and checks the search with an endgame table on the
+# boards that it has got wrong before. Run it after changing the search.
+
+import os
+import random
+import sys
+import tempfile
+
+from evaluation import count_pieces
+from evaluation import winner
+from geometry import start_board
+from movegen import movegen
+from movegen import random_board
+from movegen import reference_movegen
+from oskaplayer import alphabeta_search
+from oskaplayer import iterative_deepening
+from oskaplayer import minmax
+from ordering import MoveOrdering
+from parallel import parallel_search
+from parallel import shutdown_pool
+from stats import SearchStats
+from tablebase import Tablebase
+from tablebase import build
+from tablebase import write
+from transposition import TranspositionTable
+
+
+# The board sizes of the random boards
+SIZES = (4, 5, 6)
+
+# The numbers of steps that every board is searched with
+DEPTHS = (1, 2, 3)
+
+# The boards that the search with an endgame table of the boards of size 4
+# with at most 4 pieces has got wrong before, as (board, player, steps,
+# expected next board)
+TABLEBASE_CASES = [
+    # The jump wins at once, and the board after it is finished, so the table
+    # does not hold its value
+    (['----', '-w-', '-b', '-w-', '---w'], 'b', 1,
+     ['-b--', '---', '--', '-w-', '---w']),
+]
+
+
+# This function is the minimax search of the first version of oskaplayer. It
+# generates the list of the new boards at every step and evaluates every leaf
+# board from scratch. The boards come from reference_movegen, the move
+# generator of that version, which only differs from it in no longer moving a
+# black piece on the first cell of the first row onto the last row.
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to look ahead
+#
+#   returns the next best move in the form of a 2D array, like minmax
+def baseline_minmax(board, player, moves):
+    best = baseline_dfs(board, player, 1, moves, player)
+    next_moves = reference_movegen(board, player)
+
+    # If there is not any move that the player can make
+    if next_moves == []:
+        # If both players cannot make any moves, then the game has reached a tie
+        if reference_movegen(board, 'w' if player == 'b' else 'b') == []:
+            return None
+        # Else we let the opponent player make the next move
+        return board
+
+    return next_moves[best]
+
+
+# This function carrys out the depth-first search of baseline_minmax
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   count: the current number of steps that we have already looked through
+#   moves: the total number of steps to look ahead
+#   starting_player: the player whose favor we are in to evaluate the board
+#
+#   returns the value of the board, or at the root the index of the first
+#   best move in the list of the new boards
+def baseline_dfs(board, player, count, moves, starting_player):
+    new_boards = reference_movegen(board, player)
+    if new_boards == []:
+        return baseline_evaluator(board, starting_player)
+
+    new_player = 'w' if player == 'b' else 'b'
+    values = []
+    for new_board in new_boards:
+        if count == moves:
+            values.append(baseline_evaluator(new_board, starting_player))
+        else:
+            values.append(baseline_dfs(new_board, new_player, count + 1,
+                                       moves, starting_player))
+
+    if count == 1:
+        return values.index(max(values))
+    elif count % 2 == 0:
+        return min(values)
+    else:
+        return max(values)
+
+
+# This function evaluates a board like board_evaluator of the first version of
+# oskaplayer, which counted the pieces and steps of the board itself
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   starting_player: the player whose favor we are in to evaluate the board
+#
+#   returns 20 or -20 for a winning situation of either player, and the
+#   difference in steps otherwise
+def baseline_evaluator(board, starting_player):
+    white_count = 0
+    black_count = 0
+    white_step = 0
+    black_step = 0
+    for i in range(0, len(board)):
+        for j in range(0, len(board[i])):
+            if board[i][j] == 'b':
+                black_count += 1
+                black_step += i
+            if board[i][j] == 'w':
+                white_step += len(board) - i - 1
+                white_count += 1
+
+    if starting_player == 'w':
+        own_count, own_step = white_count, white_step
+        other_count, other_step = black_count, black_step
+    else:
+        own_count, own_step = black_count, black_step
+        other_count, other_step = white_count, white_step
+
+    # If both players have all their pieces in place, we compare the number
+    # of pieces
+    if ((black_step == 0 and white_step == 0) and
+        (black_count != 0 and white_count != 0)):
+        if own_count > other_count:
+            return 20
+        elif own_count < other_count:
+            return -20
+
+    if other_count == 0 or own_step == 0:
+        return 20
+    elif own_count == 0 or other_step == 0:
+        return -20
+    else:
+        return other_step - own_step
+
+
+# This function draws a board to check the search on. Half of the boards are
+# played from the starting board with random moves, and the other half have
+# pieces on random cells, which a game rarely gets to.
+#   @param:
+#   generator: the random.Random to draw from
+#
+#   returns the gameboard in the form of a 2D array and the player to move
+def regression_board(generator):
+    n = generator.choice(SIZES)
+    player = generator.choice('wb')
+    if generator.random() < 0.5:
+        return (random_board(n, generator), player)
+
+    board = [list(row) for row in start_board(n)]
+    player = 'w'
+    for k in range(0, generator.randint(0, 16)):
+        new_boards = movegen(board, player)
+        if new_boards != []:
+            new_board = generator.choice(new_boards)
+            if winner(*count_pieces(new_board), player) != 0:
+                break
+            board = new_board
+        player = 'w' if player == 'b' else 'b'
+    return (board, player)
+
+
+# This function searches a board in every way that is meant to choose the same
+# move as baseline_minmax: minmax with and without a transposition table,
+# alpha-beta with and without a transposition table, a move ordering and
+# statistics, which take the list of moves instead of generating
+# them one at a time, iterative deepening, and the search split between
+# worker processes
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to look ahead
+#   table: a TranspositionTable that is kept from one search to the next
+#   workers: the number of worker processes, or None to leave them out
+#
+#   returns a list of (name, next gameboard) of every search
+def searches(board, player, moves, table, workers):
+    result = [
+        ('minmax', minmax(board, player, moves)),
+        ('minmax table', minmax(board, player, moves, TranspositionTable())),
+        ('alphabeta', alphabeta_search(board, player, moves)),
+        ('alphabeta table', alphabeta_search(board, player, moves,
+                                             table=TranspositionTable())),
+        ('alphabeta kept table', alphabeta_search(board, player, moves,
+                                                  table=table)),
+        ('alphabeta order', alphabeta_search(board, player, moves,
+                                             MoveOrdering())),
+        ('alphabeta order table', alphabeta_search(board, player, moves,
+                                                   MoveOrdering(), table)),
+        ('alphabeta stats', alphabeta_search(board, player, moves,
+                                             stats=SearchStats())),
+        ('iterative deepening', iterative_deepening(board, player, 3600,
+                                                    moves, MoveOrdering(),
+                                                    TranspositionTable())),
+    ]
+    if workers is not None:
+        result.append(('parallel', parallel_search(board, player, moves,
+                                                   workers)))
+    return result
+
+
+# This function checks that all the searches choose the move of
+# baseline_minmax on random boards
+#   @param:
+#   count: the number of random boards
+#   seed: the seed of the random boards
+#   workers: the number of worker processes of the parallel search, or None
+#            to leave it out
+#
+#   returns a list of (name, board, player, moves) for every search that
+#   chose another move than baseline_minmax, empty if they all agree
+def regression(count=200, seed=0, workers=2):
+    generator = random.Random(seed)
+    mismatches = []
+    for k in range(0, count):
+        board, player = regression_board(generator)
+        table = TranspositionTable()
+        for moves in DEPTHS:
+            expected = baseline_minmax(board, player, moves)
+            for (name, found) in searches(board, player, moves, table,
+                                          workers):
+                if found != expected:
+                    mismatches.append((name, board, player, moves))
+    return mismatches
+
+
+# This function checks the search with an endgame table on the boards of
+# TABLEBASE_CASES. The table is built for the check, which takes a second.
+#
+#   returns a list of (name, board, player, moves) for every board where the
+#   search chose another move than expected, empty if it chose them all
+def tablebase_regression():
+    mismatches = []
+    handle, path = tempfile.mkstemp(suffix='.tb')
+    os.close(handle)
+    try:
+        write(path, 4, 4, build(4, 4))
+        tablebase = Tablebase(path)
+        try:
+            for (board, player, moves, expected) in TABLEBASE_CASES:
+                found = alphabeta_search([list(row) for row in board],
+                                         player, moves, tablebase=tablebase)
+                if found != [list(row) for row in expected]:
+                    mismatches.append(('alphabeta tablebase', board, player,
+                                       moves))
+        finally:
+            tablebase.close()
+    finally:
+        os.remove(path)
+    return mismatches
+
+
+# Usage: python regression.py [count] [seed] [workers]
+# where workers is 0 to leave out the parallel search
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    try:
+        mismatches = regression(count, seed, workers if workers > 1 else None)
+    finally:
+        shutdown_pool()
+    for (name, board, player, moves) in mismatches:
+        print("{} differs from the baseline on {} with {} to move, {} "
+              "steps".format(name, '/'.join(''.join(row) for row in board),
+                             player, moves))
+    for (name, board, player, moves) in tablebase_regression():
+        print("{} chose another move on {} with {} to move, {} steps".format(
+            name, '/'.join(''.join(row) for row in board), player, moves))
+        mismatches.append((name, board, player, moves))
+    print("ok" if mismatches == [] else "FAILED")
+    sys.exit(1 if mismatches else 0)
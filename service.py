@@ -0,0 +1,237 @@
+# The move service: a process that keeps running and answers move requests,
+# one JSON object per line on stdin, with one JSON object per line on stdout.
+# The transposition tables and the Monte Carlo trees stay warm from one
+# request to the next, so a game server can keep a few of these processes
+# instead of starting Python for every move.
+#
+# A request is
+#   {"id": 7, "board": ["wwww", "---", "--", "---", "bbbb"], "player": "w",
+#    "depth": 4, "time_limit": 0.5, "engine": "search", "stats": false}
+# where id is any JSON value that is sent back with the answer, depth and
+# time_limit are the budget like moves_ahead and time_limit of oskaplayer (at
+# least one of them), engine is 'search' for oskaplayer or 'mcts' for
+# mcts.mctsplayer, which takes "iterations" instead of depth, and stats asks
+# for the search statistics, see stats.SearchStats. A search stops after
+# MAX_SECONDS whatever its budget, with the move of the deepest search that
+# finished or the iterations run so far, and a depth beyond the longest line
+# of play of the board is searched as that line, see oskaplayer.line_limit.
+# The answer is
+#   {"id": 7, "move": ["-www", "w--", "--", "---", "bbbb"], "score": 1.0,
+#    "seconds": 0.01}
+# where move is null when neither player can move and the same board when the
+# player has to pass, and score is the value of the board for the player, the
+# value of board_evaluator, or the chance to win for 'mcts'. A request that
+# cannot be answered gets {"id": 7, "error": "..."}.
+#
+# {"op": "ping"} is answered with {"id": ..., "ok": true}, and {"op": "quit"}
+# stops the service once the requests before it are answered.
+#
+# The requests are handled by a pool of threads, so a quick request is not
+# stuck behind a deep search, and the answers can come in another order than
+# the requests. The threads share the interpreter, so for more searches at the
+# same time run more processes.
+
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from geometry import row_widths
+from mcts import MCTSTree
+from mcts import mctsplayer
+from oskaplayer import line_limit
+from oskaplayer import oskaplayer_value
+from stats import SearchStats
+from transposition import TranspositionTable
+from transposition import board_hash
+
+# The number of threads that handle requests by default
+WORKERS = 4
+
+# The longest time that a search may take, whatever its budget
+MAX_SECONDS = 10.0
+
+
+# This function checks that a board and a player can be searched
+#   @param:
+#   board: the gameboard of a request
+#   player: the player of a request
+#
+#   raises ValueError with the reason if they cannot
+def check_board(board, player):
+    if player not in ('w', 'b'):
+        raise ValueError("player must be 'w' or 'b'")
+    if (not isinstance(board, list) or len(board) == 0 or
+        not all(isinstance(row, str) for row in board)):
+        raise ValueError("board must be a list of strings")
+    n = len(board[0])
+    if n < 4 or [len(row) for row in board] != row_widths(n):
+        raise ValueError("board does not have the rows of an Oska board")
+    for row in board:
+        for cell in row:
+            if cell not in 'wb-':
+                raise ValueError("board has the cell {!r}".format(cell))
+
+
+# This function checks the budget of a request
+#   @param:
+#   name: the name of the field, for the message
+#   value: the value of the field, or None if the request does not have it
+#   integer: True if the value must be a whole number, like a depth
+#
+#   raises ValueError with the reason if the value is not a positive number
+def check_budget(name, value, integer):
+    if value is None:
+        return
+    if integer:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    else:
+        valid = (isinstance(value, (int, float)) and
+                 not isinstance(value, bool) and math.isfinite(value))
+    if not valid or value <= 0:
+        raise ValueError("{} must be a positive {}".format(
+            name, 'integer' if integer else 'number'))
+
+
+# This function answers one move request
+#   @param:
+#   request: the request as a dict, see the top of this file
+#   cache: the dict of the warm tables and trees of the thread, with a
+#          'table' TranspositionTable and a 'tree' MCTSTree
+#
+#   returns the answer as a dict
+def handle(request, cache):
+    board = request.get('board')
+    player = request.get('player')
+    check_board(board, player)
+    engine = request.get('engine', 'search')
+    time_limit = request.get('time_limit')
+    check_budget('time_limit', time_limit, False)
+    answer = {'id': request.get('id')}
+    start = time.perf_counter()
+
+    if engine == 'mcts':
+        iterations = request.get('iterations')
+        check_budget('iterations', iterations, True)
+        if iterations is None and time_limit is None:
+            raise ValueError("mcts needs iterations or time_limit")
+        if time_limit is None or time_limit > MAX_SECONDS:
+            time_limit = MAX_SECONDS
+        tree = cache['tree']
+        answer['move'] = mctsplayer(board, player, iterations, time_limit,
+                                    tree)
+        root = tree.nodes.get(board_hash([list(row) for row in board],
+                                         player))
+        score = None
+        if root is not None and root.visits > 0:
+            score = root.value / root.visits
+    elif engine == 'search':
+        depth = request.get('depth')
+        check_budget('depth', depth, True)
+        if depth is None and time_limit is None:
+            raise ValueError("search needs depth or time_limit")
+        if depth is not None:
+            depth = min(depth, line_limit(board))
+        if time_limit is None or time_limit > MAX_SECONDS:
+            time_limit = MAX_SECONDS
+        stats = SearchStats() if request.get('stats') else None
+        answer['move'], score = oskaplayer_value(board, player, depth,
+                                                 time_limit, cache['table'],
+                                                 stats=stats)
+        if stats is not None:
+            answer['stats'] = stats.report()
+    else:
+        raise ValueError("unknown engine {!r}".format(engine))
+
+    answer['score'] = score
+    answer['seconds'] = time.perf_counter() - start
+    return answer
+
+
+# The move service, see the top of this file
+class MoveService:
+    # This function creates the service
+    #   @param:
+    #   output: the file to write the answers to
+    #   workers: the number of threads that handle requests
+    def __init__(self, output, workers=WORKERS):
+        self.output = output
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    # This function returns the warm tables of the current thread, and creates
+    # them for its first request
+    def cache(self):
+        cache = getattr(self.local, 'cache', None)
+        if cache is None:
+            cache = {'table': TranspositionTable(), 'tree': MCTSTree()}
+            self.local.cache = cache
+        return cache
+
+    # This function writes an answer as one line
+    #   @param:
+    #   answer: the answer as a dict
+    def send(self, answer):
+        line = json.dumps(answer)
+        with self.lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    # This function answers a request in a thread of the pool
+    #   @param:
+    #   request: the request as a dict
+    def run(self, request):
+        try:
+            answer = handle(request, self.cache())
+        except Exception as error:
+            answer = {'id': request.get('id'), 'error': str(error)}
+        self.send(answer)
+
+    # This function reads one line and starts answering it
+    #   @param:
+    #   line: the line of the request
+    #
+    #   returns False when the line asks the service to stop, True otherwise
+    def submit(self, line):
+        if line.strip() == '':
+            return True
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as error:
+            self.send({'id': None, 'error': str(error)})
+            return True
+
+        op = request.get('op', 'move')
+        if op == 'quit':
+            return False
+        if op == 'ping':
+            self.send({'id': request.get('id'), 'ok': True})
+        elif op == 'move':
+            self.pool.submit(self.run, request)
+        else:
+            self.send({'id': request.get('id'),
+                       'error': "unknown op {!r}".format(op)})
+        return True
+
+    # This function answers the requests of a file until it ends or asks the
+    # service to stop, and waits for the last answers
+    #   @param:
+    #   input: the file to read the requests from
+    def serve(self, input):
+        try:
+            for line in input:
+                if not self.submit(line):
+                    break
+        finally:
+            self.pool.shutdown(wait=True)
+
+
+# Usage: python service.py [workers]
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else WORKERS
+    MoveService(sys.stdout, workers).serve(sys.stdin)
@@ -0,0 +1,152 @@
+# The simulator of many games at once with NumPy. The boards of all the games
+# are the rows of one array of cell codes, see batcheval, and every turn finds
+# the legal moves of all the games with one mask, picks a move for every game
+# and makes all the moves together. Since a player that cannot move passes,
+# every game has the same player to move at the same time.
+#
+# It needs NumPy like batcheval, see requirements.txt.
+
+import sys
+import time
+
+import numpy
+
+from batcheval import BLACK
+from batcheval import EMPTY
+from batcheval import WHITE
+from batcheval import count_batch
+from batcheval import encode
+from batcheval import legal_mask
+from batcheval import move_arrays
+from batcheval import move_counts
+from batcheval import score_batch
+from batcheval import winner_batch
+from geometry import start_board
+
+# The results of the games, like game in play
+BLACK_WINS = 1
+WHITE_WINS = 2
+TIE = -1
+PLAYING = 0
+
+
+# This function picks one of the legal moves of every game at random
+#   @param:
+#   codes: the array of cell codes of the games
+#   legal: the mask of the legal moves, see legal_mask, every row has one
+#   n: the number of cells in the first row of the boards
+#   player: the player who moves
+#   generator: the numpy.random.Generator of the simulation
+#
+#   returns the array of the chosen columns of the move arrays
+def random_policy(codes, legal, n, player, generator):
+    keys = generator.random(legal.shape)
+    return numpy.where(legal, keys, -1.0).argmax(axis=1)
+
+
+# This function picks the move with the best value of board_evaluator in every
+# game, the first one in the order of movegen among equal values, which is the
+# move of oskaplayer when it looks one step ahead
+#   @param: see random_policy
+#
+#   returns the array of the chosen columns of the move arrays
+def greedy_policy(codes, legal, n, player, generator):
+    values = score_batch(*move_counts(numpy.stack(count_batch(codes, n),
+                                                  axis=1), n, player),
+                         player)
+    return numpy.where(legal, values, -1000).argmax(axis=1)
+
+
+# The policies that can be given by name
+POLICIES = {
+    'random': random_policy,
+    'greedy': greedy_policy,
+}
+
+
+# This function plays many games to the end, all at the same time
+#   @param:
+#   boards: the starting gameboards of the games, all of the same size
+#   white: the policy of the white player, a name of POLICIES or a function
+#          with the parameters of random_policy
+#   black: the policy of the black player
+#   seed: the seed of the random choices
+#   player: the player who moves first in all the games
+#
+#   returns an array with the result of every game: BLACK_WINS, WHITE_WINS
+#   or TIE
+def simulate(boards, white='random', black='random', seed=0, player='w'):
+    n = len(boards[0][0])
+    policies = {'w': POLICIES.get(white, white),
+                'b': POLICIES.get(black, black)}
+    generator = numpy.random.default_rng(seed)
+    codes = encode(boards).copy()
+    results = numpy.full(len(boards), PLAYING)
+    games = numpy.arange(len(boards))
+
+    while True:
+        playing = games[results == PLAYING]
+        if len(playing) == 0:
+            return results
+        opponent = 'w' if player == 'b' else 'b'
+        legal = legal_mask(codes[playing], n, player)
+        can_move = legal.any(axis=1)
+
+        # A game where neither player can move is a tie, and a game where only
+        # the opponent can move is passed on to the opponent. Like in game,
+        # the win is checked after a pass too.
+        stuck = playing[~can_move]
+        if len(stuck) != 0:
+            blocked = ~legal_mask(codes[stuck], n, opponent).any(axis=1)
+            results[stuck[blocked]] = TIE
+            passing = stuck[~blocked]
+            won = winner_batch(*count_batch(codes[passing], n), player)
+            results[passing] = numpy.where(won != 0, won, PLAYING)
+
+        moving = playing[can_move]
+        if len(moving) != 0:
+            chosen = policies[player](codes[moving], legal[can_move], n,
+                                      player, generator)
+            moves = move_arrays(n)[player]
+            codes[moving, moves['frm'][chosen]] = EMPTY
+            codes[moving, moves['to'][chosen]] = (WHITE if player == 'w'
+                                                  else BLACK)
+            jumps = moves['jump'][chosen]
+            codes[moving[jumps], moves['over'][chosen[jumps]]] = EMPTY
+
+            # The win is decided with the player who has just moved, like
+            # check_win
+            won = winner_batch(*count_batch(codes[moving], n), player)
+            results[moving] = numpy.where(won != 0, won, PLAYING)
+        player = opponent
+
+
+# This function estimates the chances of a board by playing it out many times
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   games: the number of games to play
+#   white: the policy of the white player, see simulate
+#   black: the policy of the black player
+#   seed: the seed of the random choices
+#
+#   returns a dict with the 'white_rate', 'black_rate' and 'tie_rate'
+def playout_rates(board, player, games, white='random', black='random',
+                  seed=0):
+    results = simulate([board] * games, white, black, seed, player)
+    return {
+        'white_rate': float((results == WHITE_WINS).mean()),
+        'black_rate': float((results == BLACK_WINS).mean()),
+        'tie_rate': float((results == TIE).mean()),
+    }
+
+
+# Usage: python simulate.py [games] [size]
+if __name__ == '__main__':
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    start = time.perf_counter()
+    rates = playout_rates(start_board(n), 'w', games)
+    seconds = time.perf_counter() - start
+    print("{} random games on size {} in {:.2f}s, {:.0f} games/s: {}".format(
+        games, n, seconds, games / seconds, rates))
@@ -0,0 +1,192 @@
+# The solver of whole games on small boards. It plays every line of the game
+# from the starting board to its end, and keeps the value and the best move of
+# every board on the way, so that a player can look up the perfect move of any
+# board that can come up in a game. The values are the same as in tablebase:
+# d > 0 if the player to move wins with the winning move d moves from now,
+# -d < 0 if the opponent does, and 0 for a tie.
+
+import mmap
+import struct
+import sys
+
+from evaluation import EvalState
+from geometry import make_move
+from geometry import start_board
+from geometry import unmake_move
+from movegen import get_backend
+from tablebase import better
+from tablebase import parent_value
+from transposition import board_hash
+from transposition import update_hash
+from transposition import zobrist_keys
+
+
+# The first bytes of a solution file, followed by the version and the board
+# size n
+MAGIC = b'OSKASV'
+VERSION = 1
+HEADER_SIZE = 16
+
+# Every board is one record: its hash with the player to move, see board_hash,
+# its value and the index of its best move in legal_moves
+RECORD = struct.Struct('<QbB')
+
+# The best move of a board where the player has to pass
+NO_MOVE = 255
+
+# This function solves all the boards that can come up in a game from the
+# given board. The boards are solved depth first on one board, which is made
+# and taken back like in the search, and every board is solved once.
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns a dict from the hash of every board to its (value, best move)
+def solve(board, player='w'):
+    work_board = [list(row) for row in board]
+    solved = {}
+    solve_board(work_board, player, board_hash(work_board, player),
+                zobrist_keys(len(board[0])), EvalState(work_board), solved)
+    return solved
+
+
+# This function solves a board and the boards below it
+#   @param:
+#   board: the gameboard in the form of a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#   key: the hash of the board with the player to move
+#   keys: the Zobrist keys of the board size
+#   state: the EvalState of the board
+#   solved: the dict of the boards solved so far, see solve
+#
+#   returns the value of the board
+def solve_board(board, player, key, keys, state, solved):
+    if key in solved:
+        return solved[key][0]
+
+    opponent = 'w' if player == 'b' else 'b'
+    win = 2 if player == 'w' else 1
+    next_moves = get_backend().legal_moves(board, player)
+
+    # A player that cannot move passes, which is a tie when the opponent
+    # cannot move either
+    if next_moves == []:
+        value = 0
+        if get_backend().legal_moves(board, opponent) != []:
+            value = parent_value(solve_board(board, opponent,
+                                             key ^ keys['turn'], keys, state,
+                                             solved))
+        solved[key] = (value, NO_MOVE)
+        return value
+
+    best = None
+    best_value = None
+    for i in range(0, len(next_moves)):
+        move = next_moves[i]
+        state.make(move, player)
+        result = state.winner(player)
+        if result == win:
+            value = 1
+        elif result != 0:
+            value = -1
+        else:
+            make_move(board, move)
+            value = parent_value(solve_board(board, opponent,
+                                             update_hash(key, keys, player,
+                                                         move),
+                                             keys, state, solved))
+            unmake_move(board, move)
+        state.unmake(move, player)
+        if best is None or better(value, best_value):
+            best = i
+            best_value = value
+    solved[key] = (best_value, best)
+    return best_value
+
+
+# This function writes the solved boards to a file, sorted by hash
+#   @param:
+#   path: the name of the file
+#   n: the number of cells in the first row of the board
+#   solved: the solved boards, see solve
+def write(path, n, solved):
+    header = MAGIC + bytes([VERSION, n])
+    header += bytes(HEADER_SIZE - len(header))
+    with open(path, 'wb') as solution_file:
+        solution_file.write(header)
+        for key in sorted(solved):
+            value, best = solved[key]
+            solution_file.write(RECORD.pack(key, value, best))
+
+
+# The solved boards of one board size, read from a file. It can be given to
+# oskaplayer as its tablebase: every board in it is answered with the perfect
+# move, and the search takes the exact value of every board it reaches.
+class Solution:
+    # This function reads a file that write produced into a dict, so that a
+    # board is found with one lookup
+    #   @param:
+    #   path: the name of the file
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as solution_file:
+            data = mmap.mmap(solution_file.fileno(), 0,
+                             access=mmap.ACCESS_READ)
+            try:
+                header = data[:HEADER_SIZE]
+                if (header[:len(MAGIC)] != MAGIC or
+                    header[len(MAGIC)] != VERSION or
+                    (len(data) - HEADER_SIZE) % RECORD.size != 0):
+                    raise ValueError("{} is not a solution file".format(path))
+                self.n = header[len(MAGIC) + 1]
+                self.boards = {}
+                for (key, value, best) in RECORD.iter_unpack(
+                        data[HEADER_SIZE:]):
+                    self.boards[key] = (value, best)
+            finally:
+                data.close()
+
+        # Every board of the game is solved, whatever the number of pieces
+        self.pieces = 2 * self.n
+
+    # This function looks up the value of a board
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns the value for the player to move, or None if the board cannot
+    #   come up in a game
+    def probe(self, board, player):
+        if len(board[0]) != self.n:
+            return None
+        found = self.boards.get(board_hash(board, player))
+        if found is None:
+            return None
+        return found[0]
+
+    # This function looks up the best move of a board
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns the index of the move in the list of legal_moves, or None if
+    #   the board cannot come up in a game or the player has to pass
+    def best_move(self, board, player):
+        if len(board[0]) != self.n:
+            return None
+        found = self.boards.get(board_hash(board, player))
+        if found is None or found[1] == NO_MOVE:
+            return None
+        return found[1]
+
+
+# Usage: python solver.py n path
+if __name__ == '__main__':
+    n, path = int(sys.argv[1]), sys.argv[2]
+    board = start_board(n)
+    solved = solve(board, 'w')
+    write(path, n, solved)
+    value = solved[board_hash(board, 'w')][0]
+    print("{} boards, the first player {}".format(
+        len(solved), 'wins' if value > 0 else 'loses' if value < 0
+        else 'cannot force a win'))
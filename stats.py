@@ -0,0 +1,202 @@
+# The statistics of a search. A SearchStats is given to oskaplayer and filled
+# in while it searches: the number of boards searched at every step, the
+# boards evaluated, the time spent on generating moves and on evaluating, the
+# transposition table hits and the line of play that the search expects. A
+# search without one only checks that it has none at every board, so the hooks
+# stay in the search at almost no cost.
+#
+# The time is measured around every call, which slows the search down, so the
+# times say where a search spends its time rather than how long it takes
+# without the statistics.
+
+import time
+
+from geometry import apply_move
+from movegen import get_backend
+from oskaplayer import search_hash
+
+
+# The statistics of the searches of one move
+class SearchStats:
+    # This function creates empty statistics
+    #   @param:
+    #   callback: an optional function that is called with the report of the
+    #             statistics, see report, whenever a search of the move
+    #             finishes, so with every step of iterative deepening
+    def __init__(self, callback=None):
+        self.callback = callback
+        # nodes[count] is the number of boards searched count - 1 steps below
+        # the board to move on, so nodes[1] is the board itself
+        self.nodes = [0]
+        self.leaves = 0
+        self.cutoffs = 0
+        self.tablebase_hits = 0
+        self.movegen_time = 0.0
+        self.evaluate_time = 0.0
+        self.start = time.perf_counter()
+        self.total_time = 0.0
+        # The number of steps of the deepest search that finished, and the
+        # (depth, boards searched, seconds) of every search that finished
+        self.depth = 0
+        self.iterations = []
+        # The hits and probes of the transposition table during the searches
+        self.table = None
+        self.table_start = (0, 0)
+        self.table_hits = 0
+        self.table_probes = 0
+        # The moves that the search expects both players to make, as Moves
+        self.pv = []
+
+    # This function counts a board that the search reaches
+    #   @param:
+    #   count: the step of the board, like in alphabeta
+    def visit(self, count):
+        nodes = self.nodes
+        while len(nodes) <= count:
+            nodes.append(0)
+        nodes[count] += 1
+
+    # This function generates the moves of a board with the move generator of
+    # the search, see movegen.get_backend, and measures how long it takes
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns the list of Moves
+    def legal_moves(self, board, player):
+        start = time.perf_counter()
+        next_moves = get_backend().legal_moves(board, player)
+        self.movegen_time += time.perf_counter() - start
+        return next_moves
+
+    # This function wraps an evaluator so that every board that it evaluates
+    # is counted as a leaf and timed
+    #   @param:
+    #   evaluator: a function with the parameters of evaluation.score
+    #
+    #   returns the function that counts and times the evaluator
+    def timed(self, evaluator):
+        def timed_evaluator(white_count, black_count, white_step, black_step,
+                            starting_player):
+            start = time.perf_counter()
+            value = evaluator(white_count, black_count, white_step,
+                              black_step, starting_player)
+            self.evaluate_time += time.perf_counter() - start
+            self.leaves += 1
+            return value
+        return timed_evaluator
+
+    # This function starts counting the probes of the transposition table of
+    # the searches
+    #   @param:
+    #   table: the TranspositionTable of the search, or None
+    def watch(self, table):
+        if table is not None and self.table is None:
+            self.table = table
+            self.table_start = (table.hits, table.hits + table.misses)
+
+    # This function records a search that has finished
+    #   @param:
+    #   board: the gameboard that was searched
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #   moves: the number of steps that the search looked ahead
+    #   best: the Move that the search chose
+    def finish(self, board, player, moves, best):
+        self.total_time = time.perf_counter() - self.start
+        if self.table is not None:
+            self.table_hits = self.table.hits - self.table_start[0]
+            self.table_probes = (self.table.hits + self.table.misses -
+                                 self.table_start[1])
+        self.depth = moves
+        self.iterations.append((moves, sum(self.nodes), self.total_time))
+        self.pv = principal_variation(board, player, moves, best, self.table)
+        if self.callback is not None:
+            self.callback(self.report())
+
+    # This function computes the effective branching factor: the number of
+    # moves b of every board, so that a tree of b, b * b... boards as deep as
+    # the search has as many boards as the search visited
+    #
+    #   returns the effective branching factor
+    def branching_factor(self):
+        total = sum(self.nodes)
+        depth = len(self.nodes) - 2
+        if depth < 1 or total <= depth + 1:
+            return 0.0 if depth < 1 else 1.0
+        low = 1.0
+        high = float(total)
+        for i in range(0, 60):
+            middle = (low + high) / 2
+            size = 0.0
+            power = 1.0
+            for j in range(0, depth + 1):
+                size += power
+                power *= middle
+            if size < total:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+
+    # This function reports the statistics
+    #
+    #   returns a dict of the numbers, with the principal variation as a list
+    #   of moves, each a ((row, col), (row, col)) pair
+    def report(self):
+        total = self.total_time
+        return {
+            'depth': self.depth,
+            'nodes': sum(self.nodes),
+            'nodes_per_ply': self.nodes[1:],
+            'leaves': self.leaves,
+            'cutoffs': self.cutoffs,
+            'branching_factor': self.branching_factor(),
+            'seconds': total,
+            'movegen_seconds': self.movegen_time,
+            'evaluate_seconds': self.evaluate_time,
+            'other_seconds': max(total - self.movegen_time -
+                                 self.evaluate_time, 0.0),
+            'nodes_per_second': sum(self.nodes) / total if total > 0 else 0.0,
+            'table_hits': self.table_hits,
+            'table_probes': self.table_probes,
+            'table_hit_rate': (self.table_hits / self.table_probes
+                               if self.table_probes else 0.0),
+            'tablebase_hits': self.tablebase_hits,
+            'iterations': list(self.iterations),
+            'pv': [(move.frm, move.to) for move in self.pv],
+        }
+
+
+# This function follows the best moves that a transposition table stored from
+# a board, which is the line of play that the search expects
+#   @param:
+#   board: the gameboard
+#   player: either 'b' or 'w', indicating whose turn it is
+#   moves: the number of steps to follow at most
+#   best: the Move that the search chose on the board
+#   table: the TranspositionTable of the search, or None for only the first
+#          move
+#
+#   returns the list of Moves
+def principal_variation(board, player, moves, best, table):
+    if best is None:
+        return []
+    line = [best]
+    if table is None:
+        return line
+
+    # Looking the boards up is not part of the search, so it is not counted
+    counters = (table.hits, table.misses, table.collisions)
+    cur_board = apply_move(board, best)
+    cur_player = 'w' if player == 'b' else 'b'
+    while len(line) < moves:
+        entry = table.probe(search_hash(cur_board, cur_player, player))
+        next_moves = get_backend().legal_moves(cur_board, cur_player)
+        if entry is None or entry[4] >= len(next_moves):
+            break
+        move = next_moves[entry[4]]
+        line.append(move)
+        cur_board = apply_move(cur_board, move)
+        cur_player = 'w' if cur_player == 'b' else 'b'
+    table.hits, table.misses, table.collisions = counters
+    return line
@@ -0,0 +1,395 @@
+# Endgame tables for boards with few pieces. Every move brings a piece closer
+# to the other side, so the total number of steps that the pieces still need
+# goes down with every move and no board can come back. The boards are solved
+# in the order of that total: the boards a move leads to always have a smaller
+# total and are solved already, so one pass over all the boards solves them
+# all.
+#
+# A value is stored for every board and player to move, as one signed byte:
+#   0: a tie, neither player can force a win
+#   d > 0: the player to move wins, with the winning move made d moves from
+#          now, counting both players and passes
+#   -d < 0: the opponent wins d moves from now
+# Both players play the way the game is played: a player that cannot move
+# passes, the game is a tie when neither player can move, and after every move
+# check_win decides with the player who has just moved, see evaluation.winner.
+
+import itertools
+import mmap
+import sys
+from math import comb
+
+from evaluation import winner
+from geometry import geometry
+
+
+# The first bytes of a table file, followed by the version, the board size n
+# and the largest number of pieces
+MAGIC = b'OSKATB'
+VERSION = 1
+HEADER_SIZE = 16
+
+# The layouts that have already been computed, keyed by (n, pieces)
+_layouts = {}
+
+
+# This function computes how the boards of size n with at most the given
+# number of pieces are numbered. The boards with w white and b black pieces
+# take one block of numbers, and within it a board is numbered by the rank of
+# its set of white cells and the rank of its set of black cells among the cells
+# that are left. Every board gets two numbers, one for each player to move.
+#   @param:
+#   n: the number of cells in the first row of the board
+#   pieces: the largest number of pieces on the board
+#
+#   returns a dict with
+#   'n', 'pieces': the parameters
+#   'cells': the number of cells
+#   'rows': the number of rows
+#   'row_of': the row of every cell index
+#   'index': the cell index of every (row, col), see geometry
+#   'offsets': the first board of every (white count, black count) block
+#   'total': the number of values
+#   'w', 'b': for every cell index, the list of (to, captured) cell indices of
+#             the moves of a piece of that player, captured is None for a
+#             simple move
+def layout(n, pieces):
+    if (n, pieces) in _layouts:
+        return _layouts[(n, pieces)]
+
+    tables = geometry(n)
+    index = tables['index']
+    cells = len(tables['cells'])
+    offsets = {}
+    boards = 0
+    for white_count in range(1, pieces):
+        for black_count in range(1, pieces - white_count + 1):
+            if white_count > n or black_count > n:
+                continue
+            offsets[(white_count, black_count)] = boards
+            boards += comb(cells, white_count) * comb(cells - white_count,
+                                                     black_count)
+
+    result = {'n': n, 'pieces': pieces, 'cells': cells,
+              'rows': len(tables['widths']),
+              'row_of': [row for (row, col) in tables['cells']], 'index': index,
+              'offsets': offsets, 'total': 2 * boards}
+    for player in ('w', 'b'):
+        moves = []
+        for (row, col) in tables['cells']:
+            cell_moves = []
+            for (frm, to, captured) in tables[player][row][col]:
+                cell_moves.append((index[to], None if captured is None
+                                   else index[captured]))
+            moves.append(cell_moves)
+        result[player] = moves
+    _layouts[(n, pieces)] = result
+    return result
+
+
+# This function numbers a board
+#   @param:
+#   layout: the layout of the table, see layout
+#   white: the sorted cell indices of the white pieces
+#   black: the sorted cell indices of the black pieces
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns the number of the board in the table, or None if the table does
+#   not hold boards with these piece counts
+def position_index(layout, white, black, player):
+    key = (len(white), len(black))
+    if key not in layout['offsets']:
+        return None
+
+    white_rank = 0
+    for k in range(0, len(white)):
+        white_rank += comb(white[k], k + 1)
+
+    # The black cells are counted among the cells without a white piece
+    black_rank = 0
+    skipped = 0
+    for k in range(0, len(black)):
+        while skipped < len(white) and white[skipped] < black[k]:
+            skipped += 1
+        black_rank += comb(black[k] - skipped, k + 1)
+
+    blacks = comb(layout['cells'] - len(white), len(black))
+    number = layout['offsets'][key] + white_rank * blacks + black_rank
+    return 2 * number + (1 if player == 'b' else 0)
+
+
+# This function lists the moves of a player on a board given by its cells
+#   @param:
+#   layout: the layout of the table, see layout
+#   white: the sorted cell indices of the white pieces
+#   black: the sorted cell indices of the black pieces
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns a list of (white, black, captured) for the boards after every move
+#   in the order of movegen, where captured is True for a jump
+def cell_moves(layout, white, black, player):
+    own, opponent = (white, black) if player == 'w' else (black, white)
+    occupied = set(white)
+    occupied.update(black)
+    result = []
+    for frm in own:
+        for (to, captured) in layout[player][frm]:
+            if to in occupied:
+                continue
+            if captured is not None and captured not in opponent:
+                continue
+            new_own = sorted([cell for cell in own if cell != frm] + [to])
+            new_opponent = opponent
+            if captured is not None:
+                new_opponent = [cell for cell in opponent if cell != captured]
+            if player == 'w':
+                result.append((new_own, new_opponent, captured is not None))
+            else:
+                result.append((new_opponent, new_own, captured is not None))
+    return result
+
+
+# This function counts the pieces and steps of a board given by its cells
+#   @param:
+#   layout: the layout of the table, see layout
+#   white: the cell indices of the white pieces
+#   black: the cell indices of the black pieces
+#
+#   returns the tuple (white_count, black_count, white_step, black_step), like
+#   count_pieces
+def cell_counts(layout, white, black):
+    rows = layout['rows']
+    row_of = layout['row_of']
+    white_step = 0
+    for cell in white:
+        white_step += rows - row_of[cell] - 1
+    black_step = 0
+    for cell in black:
+        black_step += row_of[cell]
+    return (len(white), len(black), white_step, black_step)
+
+
+# This function turns the value of the board after a move into the value for
+# the player who made it
+#   @param:
+#   value: the value of the board after the move for the opponent
+#
+#   returns the value for the player who moved
+def parent_value(value):
+    if value > 0:
+        return -(value + 1)
+    if value < 0:
+        return 1 - value
+    return 0
+
+
+# This function decides whether one value is better than another for the
+# player to move: a win as soon as possible, then a tie, then a loss as late
+# as possible
+#   @param:
+#   value: the new value
+#   best: the best value so far
+#
+#   returns True if value is better than best
+def better(value, best):
+    if (value > 0) != (best > 0):
+        return value > 0
+    if value > 0:
+        return value < best
+    if value == 0 or best == 0:
+        return value == 0 and best < 0
+    return value < best
+
+
+# This function computes the value of a board for the player to move from the
+# values of the boards that the moves lead to
+#   @param:
+#   layout: the layout of the table, see layout
+#   values: the values computed so far, by number
+#   white: the sorted cell indices of the white pieces
+#   black: the sorted cell indices of the black pieces
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns the index of the best move in cell_moves, or None if the player
+#   cannot move, and the value of the board
+def solve_board(layout, values, white, black, player):
+    opponent = 'w' if player == 'b' else 'b'
+    win = 2 if player == 'w' else 1
+    best = None
+    best_value = None
+    moves = cell_moves(layout, white, black, player)
+    for k in range(0, len(moves)):
+        new_white, new_black, captured = moves[k]
+        result = winner(*cell_counts(layout, new_white, new_black), player)
+        if result == win:
+            value = 1
+        elif result != 0:
+            value = -1
+        else:
+            value = parent_value(values[position_index(
+                layout, new_white, new_black, opponent)])
+        if best is None or better(value, best_value):
+            best = k
+            best_value = value
+    return (best, best_value)
+
+
+# This function solves all the boards of size n with at most the given number
+# of pieces, with at least one piece of each player
+#   @param:
+#   n: the number of cells in the first row of the board
+#   pieces: the largest number of pieces on the board
+#
+#   returns a list with the value of every board, by number
+def build(n, pieces):
+    table = layout(n, pieces)
+    rows = table['rows']
+    row_of = table['row_of']
+    values = [0] * table['total']
+
+    # The boards are grouped by the steps that their pieces still need
+    groups = {}
+    for (white_count, black_count) in table['offsets']:
+        for white in itertools.combinations(range(table['cells']),
+                                            white_count):
+            white_step = 0
+            for cell in white:
+                white_step += rows - row_of[cell] - 1
+            free = [cell for cell in range(table['cells'])
+                    if cell not in white]
+            for black in itertools.combinations(free, black_count):
+                steps = white_step
+                for cell in black:
+                    steps += row_of[cell]
+                groups.setdefault(steps, []).append((list(white), list(black)))
+
+    for steps in sorted(groups):
+        for (white, black) in groups[steps]:
+            solved = {}
+            for player in ('w', 'b'):
+                solved[player] = solve_board(table, values, white, black,
+                                             player)
+
+            # A player that cannot move passes, which is a tie when the
+            # opponent cannot move either
+            for player in ('w', 'b'):
+                opponent = 'w' if player == 'b' else 'b'
+                best, value = solved[player]
+                if best is None:
+                    value = 0
+                    if solved[opponent][0] is not None:
+                        value = parent_value(solved[opponent][1])
+                if value > 127 or value < -127:
+                    raise ValueError("a distance does not fit in the table")
+                values[position_index(table, white, black, player)] = value
+    return values
+
+
+# This function writes a table to a file
+#   @param:
+#   path: the name of the file
+#   n: the number of cells in the first row of the board
+#   pieces: the largest number of pieces on the board
+#   values: the values, see build
+def write(path, n, pieces, values):
+    header = MAGIC + bytes([VERSION, n, pieces])
+    header += bytes(HEADER_SIZE - len(header))
+    with open(path, 'wb') as table_file:
+        table_file.write(header)
+        table_file.write(bytes(value & 0xFF for value in values))
+
+
+# An endgame table on disk. The file is mapped into memory, so opening a table
+# costs nothing and the values are only read from disk when they are probed.
+class Tablebase:
+    # This function opens a table file that write produced
+    #   @param:
+    #   path: the name of the file
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        header = self.data[:HEADER_SIZE]
+        if header[:len(MAGIC)] != MAGIC or header[len(MAGIC)] != VERSION:
+            self.close()
+            raise ValueError("{} is not an endgame table".format(path))
+        self.n = header[len(MAGIC) + 1]
+        self.pieces = header[len(MAGIC) + 2]
+        self.layout = layout(self.n, self.pieces)
+        if len(self.data) != HEADER_SIZE + self.layout['total']:
+            self.close()
+            raise ValueError("{} is cut short".format(path))
+
+    # This function closes the file
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    # This function finds the cells of the pieces of a board
+    #   @param:
+    #   board: the gameboard
+    #
+    #   returns the sorted cell indices of the white and the black pieces, or
+    #   None if the table does not hold the board
+    def cells(self, board):
+        if len(board[0]) != self.n:
+            return None
+        white = []
+        black = []
+        cell = 0
+        for row in board:
+            for col in row:
+                if col == 'w':
+                    white.append(cell)
+                elif col == 'b':
+                    black.append(cell)
+                cell += 1
+        if (len(white), len(black)) not in self.layout['offsets']:
+            return None
+        return (white, black)
+
+    # This function looks up the value of a board
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns the value for the player to move, see the top of the module,
+    #   or None if the table does not hold the board
+    def probe(self, board, player):
+        found = self.cells(board)
+        if found is None:
+            return None
+        value = self.data[HEADER_SIZE +
+                          position_index(self.layout, found[0], found[1],
+                                         player)]
+        return value - 256 if value > 127 else value
+
+    # This function finds the move that keeps the value of a board, the first
+    # one in the order of movegen
+    #   @param:
+    #   board: the gameboard
+    #   player: either 'b' or 'w', indicating whose turn it is
+    #
+    #   returns the index of the move in the list of legal_moves, or None if
+    #   the table does not hold the board or the player cannot move
+    def best_move(self, board, player):
+        found = self.cells(board)
+        if found is None:
+            return None
+        return solve_board(self.layout, self, found[0], found[1], player)[0]
+
+    # This function reads a value by number, so that solve_board can read the
+    # values of the table like the list of build
+    #   @param:
+    #   number: the number of the board
+    #
+    #   returns the value
+    def __getitem__(self, number):
+        value = self.data[HEADER_SIZE + number]
+        return value - 256 if value > 127 else value
+
+
+# Usage: python tablebase.py n pieces path
+if __name__ == '__main__':
+    n, pieces, path = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+    write(path, n, pieces, build(n, pieces))
@@ -0,0 +1,201 @@
+import math
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+from evaluation import count_pieces
+from evaluation import winner
+from geometry import start_board
+from mcts import MCTSTree
+from mcts import mctsplayer
+from movegen import movegen
+from oskaplayer import convert_format
+from oskaplayer import oskaplayer
+
+
+# The settings of a player in a tournament
+#   kind: 'search' for oskaplayer, 'mcts' for mcts.mctsplayer, or 'random'
+#         for a player that picks one of its moves at random
+#   depth: the number of steps that oskaplayer looks ahead, or the number of
+#          iterations of mctsplayer
+#   time_limit: the number of seconds that the player may take, see oskaplayer
+#   evaluator: the optional evaluator of oskaplayer, a module level function
+#              so that it can be sent to the worker processes
+PlayerConfig = namedtuple('PlayerConfig',
+                          ['kind', 'depth', 'time_limit', 'evaluator'],
+                          defaults=['search', 2, None, None])
+
+# The player that picks one of its moves at random
+RANDOM_PLAYER = PlayerConfig('random')
+
+# The result of one game
+#   size: the size n of the board
+#   index: the number of the game among the games on that board
+#   result: 1 if the black wins, 2 if the white wins and -1 for a tie
+GameResult = namedtuple('GameResult', ['size', 'index', 'result'])
+
+
+# This function lets a player choose the next move
+#   @param:
+#   board: the gameboard in the form of a list of strings
+#   player: either 'b' or 'w', indicating whose turn it is
+#   config: the PlayerConfig of the player
+#   generator: the random.Random of the game
+#   tree: the MCTSTree that an 'mcts' player keeps during the game
+#
+#   returns the next board in the form of a list of strings, the same board if
+#   the player has to pass, or None if neither player can move
+def choose_move(board, player, config, generator, tree=None):
+    if config.kind == 'random':
+        new_boards = movegen([list(row) for row in board], player)
+        if new_boards == []:
+            if movegen([list(row) for row in board],
+                       'w' if player == 'b' else 'b') == []:
+                return None
+            return board
+        return convert_format(generator.choice(new_boards))
+    if config.kind == 'mcts':
+        return mctsplayer(board, player, config.depth, config.time_limit,
+                          tree)
+
+    return oskaplayer(board, player, config.depth, config.time_limit,
+                      evaluator=config.evaluator)
+
+
+# This function plays one game to the end
+#   @param:
+#   board: the starting gameboard in the form of a list of strings
+#   white: the PlayerConfig of the white player, who moves first
+#   black: the PlayerConfig of the black player
+#   seed: the seed of the random choices in the game
+#
+#   returns:
+#           1 if the black wins
+#           2 if the white wins
+#           -1 if there is a tie
+def play_game(board, white, black, seed):
+    generator = random.Random(seed)
+    configs = {'w': white, 'b': black}
+    trees = {}
+    for (player, config) in configs.items():
+        if config.kind == 'mcts':
+            trees[player] = MCTSTree(seed=generator.random())
+    player = 'w'
+    cur_board = board
+    while True:
+        cur_board = choose_move(cur_board, player, configs[player], generator,
+                                trees.get(player))
+        if cur_board is None:
+            return -1
+        white_count, black_count, white_step, black_step = count_pieces(cur_board)
+        result = winner(white_count, black_count, white_step, black_step, player)
+        if result != 0:
+            return result
+        player = 'b' if player == 'w' else 'w'
+
+
+# This function runs in a worker process and plays one game of a tournament.
+# The seed of the game only depends on the seed of the tournament, the board
+# size and the number of the game, so a game can be played again on its own.
+#   @param:
+#   size: the size n of the board
+#   index: the number of the game
+#   white: the PlayerConfig of the white player
+#   black: the PlayerConfig of the black player
+#   seed: the seed of the tournament
+#
+#   returns the GameResult
+def run_game(size, index, white, black, seed):
+    game_seed = "{}:{}:{}".format(seed, size, index)
+    board = start_board(size)
+    return GameResult(size, index, play_game(board, white, black, game_seed))
+
+
+# This function plays the games of a tournament on a pool of worker processes
+# and yields their results as soon as they finish
+#   @param:
+#   sizes: the board sizes to play on
+#   white: the PlayerConfig of the white player
+#   black: the PlayerConfig of the black player
+#   games: the number of games on every board size
+#   workers: the number of worker processes, the number of cores without it.
+#            With one worker the games are played in this process.
+#   seed: the seed of the tournament
+#
+#   yields a GameResult for every game, in the order in which they finish
+def iter_games(sizes, white, black, games, workers=None, seed=0):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        for size in sizes:
+            for index in range(0, games):
+                yield run_game(size, index, white, black, seed)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for size in sizes:
+            for index in range(0, games):
+                futures.append(pool.submit(run_game, size, index, white,
+                                           black, seed))
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# This function computes the Wilson score interval of a rate
+#   @param:
+#   successes: the number of games that count
+#   total: the number of games
+#   z: the quantile of the normal distribution, 1.96 for 95% confidence
+#
+#   returns the (low, high) bounds of the rate
+def wilson_interval(successes, total, z=1.96):
+    if total == 0:
+        return (0.0, 1.0)
+    rate = successes / total
+    denominator = 1 + z * z / total
+    center = (rate + z * z / (2 * total)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / total +
+                           z * z / (4 * total * total)) / denominator
+    return (center - margin, center + margin)
+
+
+# This function plays a tournament and sums up the results of every board size
+# from the point of view of the white player
+#   @param:
+#   sizes: the board sizes to play on
+#   white: the PlayerConfig of the white player
+#   black: the PlayerConfig of the black player
+#   games: the number of games on every board size
+#   workers: the number of worker processes, see iter_games
+#   seed: the seed of the tournament
+#   on_result: an optional function that is called with every GameResult as
+#              soon as the game finishes
+#
+#   returns a dict from the board size to a dict with the number of games,
+#   wins, losses and ties, and the rate and 95% interval of each of them
+def tournament(sizes, white, black, games, workers=None, seed=0,
+               on_result=None):
+    counts = {}
+    for size in sizes:
+        counts[size] = {2: 0, 1: 0, -1: 0}
+    for game in iter_games(sizes, white, black, games, workers, seed):
+        counts[game.size][game.result] += 1
+        if on_result is not None:
+            on_result(game)
+
+    summary = {}
+    for size in sizes:
+        total = sum(counts[size].values())
+        summary[size] = {'games': total}
+        for plural, name, result in (('wins', 'win', 2),
+                                     ('losses', 'loss', 1),
+                                     ('ties', 'tie', -1)):
+            summary[size][plural] = counts[size][result]
+            summary[size][name + '_rate'] = (counts[size][result] / total
+                                             if total else 0.0)
+            summary[size][name + '_interval'] = wilson_interval(
+                counts[size][result], total)
+    return summary
@@ -0,0 +1,170 @@
+import random
+
+from geometry import row_widths
+
+
+# The bound types of a stored value. An exact value is the result of the search
+# of the board; a lower (or upper) bound is the result of a search that was cut
+# off, so the real value is at least (or at most) the stored one
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# The Zobrist keys that have already been generated, keyed by the board size n
+_zobrist = {}
+
+
+# This function returns the Zobrist keys of a board of size n. The keys are
+# drawn from a generator seeded with n, so every process hashes the same board
+# to the same number.
+#   @param:
+#   n: the number of cells in the first row of the board
+#
+#   returns a dict with
+#   'w', 'b': a random 64 bit key for every row and column and piece color
+#   'turn': the key that is added when black is to move
+#   'perspective': the key that is added when the board is evaluated in favor
+#                  of black, since the stored values depend on it
+def zobrist_keys(n):
+    if n in _zobrist:
+        return _zobrist[n]
+
+    generator = random.Random(0x05CA + n)
+    keys = {}
+    for player in ('w', 'b'):
+        keys[player] = []
+        for width in row_widths(n):
+            keys[player].append([generator.getrandbits(64)
+                                 for col in range(0, width)])
+    keys['turn'] = generator.getrandbits(64)
+    keys['perspective'] = generator.getrandbits(64)
+
+    _zobrist[n] = keys
+    return keys
+
+
+# This function computes the Zobrist hash of a board from scratch
+#   @param:
+#   board: the gameboard in the form of a list of strings or a 2D array
+#   player: either 'b' or 'w', indicating whose turn it is
+#
+#   returns the 64 bit hash of the board and the player to move
+def board_hash(board, player):
+    keys = zobrist_keys(len(board[0]))
+    key = 0
+    for i in range(0, len(board)):
+        for j in range(0, len(board[i])):
+            if board[i][j] == 'w' or board[i][j] == 'b':
+                key ^= keys[board[i][j]][i][j]
+    if player == 'b':
+        key ^= keys['turn']
+    return key
+
+
+# This function updates a Zobrist hash for a move, without looking at the rest
+# of the board
+#   @param:
+#   key: the hash of the board before the move
+#   keys: the Zobrist keys of the board size, see zobrist_keys
+#   player: the player that makes the move
+#   move: the Move
+#
+#   returns the hash of the board after the move, with the opponent to move
+def update_hash(key, keys, player, move):
+    frm, to, captured = move
+    own = keys[player]
+    key ^= own[frm[0]][frm[1]] ^ own[to[0]][to[1]] ^ keys['turn']
+    if captured is not None:
+        key ^= keys['w' if player == 'b' else 'b'][captured[0]][captured[1]]
+    return key
+
+
+# A fixed size transposition table. The table is split into buckets of two
+# slots: the first slot keeps the entry that was searched the deepest, and the
+# second slot always takes the newest entry that did not go into the first.
+# Every entry is a (key, depth, value, bound, best) tuple, where depth is the
+# number of steps searched below the board and best is the index of the best
+# move in the list of moves of the board.
+class TranspositionTable:
+    # This function creates an empty table
+    #   @param:
+    #   max_entries: the number of entries that the table can hold
+    def __init__(self, max_entries=1 << 20):
+        self.buckets = max_entries // 2
+        if self.buckets < 1:
+            self.buckets = 1
+        self.slots = [None] * (2 * self.buckets)
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    # This function looks up the entry of a board
+    #   @param:
+    #   key: the hash of the board
+    #
+    #   returns the stored entry, or None if the board is not in the table
+    def probe(self, key):
+        slot = 2 * (key % self.buckets)
+        entry = self.slots[slot]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        other = self.slots[slot + 1]
+        if other is not None and other[0] == key:
+            self.hits += 1
+            return other
+
+        # A miss on a bucket that holds other boards is counted as a collision
+        self.misses += 1
+        if entry is not None or other is not None:
+            self.collisions += 1
+        return None
+
+    # This function stores the result of the search of a board
+    #   @param:
+    #   key: the hash of the board
+    #   depth: the number of steps that were searched below the board
+    #   value: the value found by the search
+    #   bound: EXACT, LOWER or UPPER
+    #   best: the index of the best move
+    def store(self, key, depth, value, bound, best):
+        slot = 2 * (key % self.buckets)
+        entry = self.slots[slot]
+        new_entry = (key, depth, value, bound, best)
+        if entry is None or entry[0] == key or depth >= entry[1]:
+            # The entry that is pushed out of the first slot still gets the
+            # second slot, unless it is an older copy of the same board
+            if entry is not None and entry[0] != key:
+                self.slots[slot + 1] = entry
+            elif (self.slots[slot + 1] is not None and
+                  self.slots[slot + 1][0] == key):
+                self.slots[slot + 1] = None
+            self.slots[slot] = new_entry
+        else:
+            self.slots[slot + 1] = new_entry
+
+    # This function empties the table and resets the counters
+    def clear(self):
+        self.slots = [None] * (2 * self.buckets)
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+
+    # This function returns the number of stored entries
+    def __len__(self):
+        return len(self.slots) - self.slots.count(None)
+
+    # This function reports how well the table is working
+    #
+    #   returns a dict with the counters, the number of stored entries and the
+    #   fraction of probes that found their board
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'max_entries': len(self.slots),
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }